@@ -0,0 +1,112 @@
+# benchmarks/formats.py
+"""
+Compare JSON, MessagePack and Apache Arrow IPC for bulk list responses.
+
+Fills a temporary database with cars, then for each format measures the time
+to query and encode a page, the payload size and the time to decode it. The
+JSON row reproduces what the list endpoints do by default: validating ORM
+objects against a response schema (the flat CarListResponse, so it is a lower
+bound for the nested CarResponse) before serializing.
+
+Usage:
+    python benchmarks/formats.py [--rows 50000] [--repeat 5]
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def median_of(repeat, fn):
+    """
+    Run fn repeatedly and return its last result and the median duration in milliseconds.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return result, statistics.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    sys.path.insert(0, REPO_ROOT)
+
+    from typing import List
+    from pydantic import TypeAdapter
+    from sqlalchemy import insert, select
+    import formats
+    from db import SessionLocal, engine
+    from migrations import upgrade
+    from models import Car, Dealer
+    from schemas import CarListResponse
+
+    upgrade(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Dealer), [{"id": 1, "name": "Bench Motors", "location": "Here", "contact_info": ""}])
+        conn.execute(insert(Car), [
+            {"make": "Toyota", "model": f"Model {i % 50}", "year": 2000 + i % 25, "color": "Silver",
+             "vin": f"VIN{i:012d}", "price": 20000.0 + i, "dealer_id": 1}
+            for i in range(args.rows)
+        ])
+
+    adapter = TypeAdapter(List[CarListResponse])
+
+    def encode_json():
+        with SessionLocal() as db:
+            cars = db.query(Car).limit(args.rows).all()
+            return json.dumps(adapter.dump_python(adapter.validate_python(cars, from_attributes=True), mode="json")).encode()
+
+    def encode_binary(media_type):
+        def encode():
+            with SessionLocal() as db:
+                result = db.execute(select(*Car.__table__.columns).limit(args.rows))
+                return formats.encode(list(result.keys()), result, media_type)
+        return encode
+
+    def decode_msgpack(payload):
+        import msgpack
+        return msgpack.unpackb(payload)
+
+    def decode_arrow(payload):
+        import pyarrow as pa
+        return pa.ipc.open_stream(payload).read_all()
+
+    cases = [("json", encode_json, json.loads)]
+    try:
+        import msgpack  # noqa: F401
+        cases.append(("msgpack", encode_binary(formats.MSGPACK_MEDIA_TYPE), decode_msgpack))
+    except ImportError:
+        print("msgpack is not installed, skipping MessagePack")
+    try:
+        import pyarrow  # noqa: F401
+        cases.append(("arrow", encode_binary(formats.ARROW_MEDIA_TYPE), decode_arrow))
+    except ImportError:
+        print("pyarrow is not installed, skipping Arrow")
+
+    print(f"{args.rows} cars, median of {args.repeat} runs")
+    print(f"{'format':<10}{'size (KiB)':>12}{'encode (ms)':>14}{'decode (ms)':>14}")
+    for name, encode, decode in cases:
+        payload, encode_ms = median_of(args.repeat, encode)
+        _, decode_ms = median_of(args.repeat, lambda: decode(payload))
+        print(f"{name:<10}{len(payload) / 1024:>12.1f}{encode_ms:>14.1f}{decode_ms:>14.1f}")
+
+    engine.dispose()
+    shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# benchmarks/sharding.py
+"""
+Measure write throughput with the database split into dealer shards.
+
+Each configuration starts a fresh interpreter on empty databases, creates a
+set of dealers and then forks writer processes that each add cars, one
+commit per car, for the dealers assigned to them. SQLite serializes writers
+per database file, so spreading dealers over more shards lets more of those
+commits proceed at the same time.
+
+Usage:
+    python benchmarks/sharding.py [--shards 1 2 4] [--writers 8] [--cars 200]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r"""
+import json, multiprocessing, sys, time
+import main
+from session import SessionLocal
+from models import Car, Dealer
+
+writers, cars_per_writer = int(sys.argv[1]), int(sys.argv[2])
+
+db = SessionLocal()
+dealers = [Dealer(name=f"Dealer {i}", location="Bench") for i in range(writers * 4)]
+db.add_all(dealers)
+db.commit()
+dealer_ids = [dealer.id for dealer in dealers]
+db.close()
+
+
+def write(index):
+    import db as database
+    import shards
+    # Connections must not be shared with the parent process.
+    database.engine.dispose(close=False)
+    for engine in shards.engines.values():
+        engine.dispose(close=False)
+    own = dealer_ids[index::writers]
+    session = SessionLocal()
+    for n in range(cars_per_writer):
+        session.add(Car(
+            make="Make", model="Model", year=2020, color="red", vin=f"VIN-{index}-{n}",
+            price=20000.0, dealer_id=own[n % len(own)],
+        ))
+        session.commit()
+    session.close()
+
+
+start = time.perf_counter()
+with multiprocessing.get_context("fork").Pool(writers) as pool:
+    pool.map(write, range(writers))
+elapsed = time.perf_counter() - start
+print(json.dumps({"cars": writers * cars_per_writer, "seconds": elapsed}))
+"""
+
+
+def run_once(shard_count, writers, cars, tmp):
+    """
+    Run the writers against fresh databases split into shard_count shards (0 for unsharded).
+    """
+    directory = tempfile.mkdtemp(dir=tmp)
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(directory, 'main.db')}")
+    env.pop("SHARD_URLS", None)
+    if shard_count:
+        env["SHARD_URLS"] = ",".join(
+            f"sqlite:///{os.path.join(directory, f'shard_{index}.db')}" for index in range(shard_count)
+        )
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD, str(writers), str(cars)], cwd=REPO_ROOT, env=env,
+        check=True, capture_output=True, text=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--cars", type=int, default=200, help="Cars added by each writer.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'shards':<12}{'cars':>8}{'seconds':>10}{'cars/s':>10}")
+        for shard_count in [0] + args.shards:
+            result = run_once(shard_count, args.writers, args.cars, tmp)
+            label = str(shard_count) if shard_count else "unsharded"
+            rate = result["cars"] / result["seconds"]
+            print(f"{label:<12}{result['cars']:>8}{result['seconds']:>10.2f}{rate:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# benchmarks/startup.py
+"""
+Measure cold-start time of the app in "eager" and "lazy" startup modes.
+
+Each run starts a fresh interpreter against a database that has already been
+created, times `import main` (what uvicorn does before it accepts traffic) and
+then the first request, which in lazy mode also pays for importing the routes.
+
+Usage:
+    python benchmarks/startup.py [--runs 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r"""
+import asyncio, json, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+
+
+async def first_request():
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": "/dealers/", "raw_path": b"/dealers/",
+        "root_path": "", "query_string": b"", "headers": [],
+        "client": ("127.0.0.1", 0), "server": ("127.0.0.1", 8000),
+    }
+    await main.app(scope, receive, send)
+    return sent[0]["status"]
+
+
+status = asyncio.run(first_request())
+served = time.perf_counter()
+print(json.dumps({"import": imported - start, "first_request": served - imported, "status": status}))
+"""
+
+
+def run_once(mode, database_url):
+    """
+    Start a fresh interpreter in the given startup mode and return its timings.
+    """
+    env = dict(os.environ, STARTUP_MODE=mode, DATABASE_URL=database_url)
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD], cwd=REPO_ROOT, env=env,
+        check=True, capture_output=True, text=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        # Create and stamp the database once so every measured run is a restart.
+        run_once("eager", database_url)
+
+        print(f"{'mode':<8}{'import (ms)':>14}{'first req (ms)':>17}{'total (ms)':>13}")
+        for mode in ("eager", "lazy"):
+            runs = [run_once(mode, database_url) for _ in range(args.runs)]
+            imported = statistics.median(r["import"] for r in runs) * 1000
+            first = statistics.median(r["first_request"] for r in runs) * 1000
+            print(f"{mode:<8}{imported:>14.1f}{first:>17.1f}{imported + first:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# benchmarks/vins.py
+"""
+Measure VIN lookups with and without the in-process VIN index.
+
+Fills a temporary database with cars, then times vins.lookup_car_id for VINs
+that are stored and for VINs that are not, first with VIN_INDEX=off (a query
+on the unique index of cars.vin per lookup) and then with VIN_INDEX=on.
+
+Usage:
+    python benchmarks/vins.py [--rows 100000] [--lookups 20000]
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--lookups", type=int, default=20000)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    sys.path.insert(0, REPO_ROOT)
+
+    from sqlalchemy import insert
+    import vins
+    from db import SessionLocal, engine
+    from migrations import upgrade
+    from models import Car, Dealer
+
+    upgrade(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Dealer), [{"id": 1, "name": "Bench Motors", "location": "Here", "contact_info": ""}])
+        conn.execute(insert(Car), [
+            {"make": "Toyota", "model": "Corolla", "year": 2020, "color": "Silver",
+             "vin": f"VIN{i:014d}", "price": 20000.0, "dealer_id": 1}
+            for i in range(args.rows)
+        ])
+
+    known = [f"VIN{random.randrange(args.rows):014d}" for _ in range(args.lookups)]
+    unknown = [f"NEW{i:014d}" for i in range(args.lookups)]
+
+    print(f"{args.rows} cars, {args.lookups} lookups each")
+    print(f"{'index':<8}{'first use (ms)':>16}{'known (us)':>12}{'unknown (us)':>14}")
+    for mode in ("off", "on"):
+        vins.VIN_INDEX = mode
+        with SessionLocal() as db:
+            start = time.perf_counter()
+            vins.lookup_car_id(db, unknown[0])
+            first_ms = (time.perf_counter() - start) * 1000
+            timings = []
+            for batch in (known, unknown):
+                start = time.perf_counter()
+                for vin in batch:
+                    vins.lookup_car_id(db, vin)
+                timings.append((time.perf_counter() - start) / len(batch) * 1e6)
+        print(f"{mode:<8}{first_ms:>16.1f}{timings[0]:>12.1f}{timings[1]:>14.1f}")
+
+    engine.dispose()
+    shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main()
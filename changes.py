@@ -0,0 +1,218 @@
+# changes.py
+import asyncio
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import event, inspect, insert
+from sqlalchemy.ext.horizontal_shard import set_shard_id
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from models import ChangeLog, Dealer, Car, Customer, Sale
+
+# The models whose inserts, updates and deletes are written to the change log.
+TRACKED_MODELS = (Dealer, Car, Customer, Sale)
+
+# How often a waiting consumer re-checks the change log for changes committed by other processes.
+POLL_INTERVAL = 0.5
+
+_lock = threading.Lock()
+
+# The (event loop, asyncio.Event) of every consumer waiting in this process, set on each commit.
+_waiters = set()
+
+# Number of transactions with logged changes committed by this process.
+commit_count = 0
+
+
+def _column_keys(state):
+    """
+    Return the attribute names of the mapped columns of an instance.
+    """
+    return [attr.key for attr in state.mapper.column_attrs]
+
+
+def _changed_column_keys(state):
+    """
+    Return the attribute names of the columns changed on an instance since it was loaded.
+    """
+    return [key for key in _column_keys(state) if state.attrs[key].history.has_changes()]
+
+
+@event.listens_for(Session, "after_flush")
+def _record_changes(session, flush_context):
+    """
+    Append a change log entry for every tracked row inserted, updated or deleted by the flush.
+
+    The entries are inserted on the flush's connection, so they commit or roll
+    back together with the changes they describe.
+    """
+    now = datetime.utcnow()
+    entries = []
+    for obj in session.new:
+        if isinstance(obj, TRACKED_MODELS):
+            state = inspect(obj)
+            columns = [key for key in _column_keys(state) if getattr(obj, key) is not None]
+            entries.append(("insert", state, columns))
+    for obj in session.dirty:
+        if isinstance(obj, TRACKED_MODELS):
+            state = inspect(obj)
+            columns = _changed_column_keys(state)
+            if columns:
+                entries.append(("update", state, columns))
+    for obj in session.deleted:
+        if isinstance(obj, TRACKED_MODELS):
+            entries.append(("delete", inspect(obj), []))
+    if not entries:
+        return
+
+    # In sharded mode each entry goes to the change log of the shard the row lives on.
+    by_shard = {}
+    for op, state, columns in entries:
+        by_shard.setdefault(state.identity_token, []).append({
+            "entity": state.mapper.local_table.name,
+            "entity_id": state.mapper.primary_key_from_instance(state.obj())[0],
+            "op": op,
+            "changed_columns": ",".join(columns),
+            "changed_at": now,
+        })
+    for shard_id, rows in by_shard.items():
+        bind_arguments = {"shard_id": shard_id} if shard_id is not None else None
+        session.connection(bind_arguments=bind_arguments).execute(insert(ChangeLog), rows)
+    session.info["changes_recorded"] = True
+
+
+def record_rows(conn, op, table, rows):
+    """
+    Append change log entries for rows inserted or deleted with Core statements, outside a session.
+
+    Parameters:
+        conn (Connection): The connection the rows were written on, inside its transaction.
+        op (str): The kind of change: "insert" or "delete".
+        table (Table): The table of the rows.
+        rows (List[Mapping]): The rows, keyed by column name.
+    """
+    now = datetime.utcnow()
+    entries = [
+        {
+            "entity": table.name,
+            "entity_id": row["id"],
+            "op": op,
+            "changed_columns": (
+                ",".join(key for key, value in row.items() if value is not None) if op == "insert" else ""
+            ),
+            "changed_at": now,
+        }
+        for row in rows
+    ]
+    if entries:
+        conn.execute(insert(ChangeLog), entries)
+
+
+@event.listens_for(Session, "after_commit")
+def _notify_waiters(session):
+    """
+    Wake up consumers waiting in this process once recorded changes are committed.
+    """
+    global commit_count
+    if session.info.pop("changes_recorded", False):
+        with _lock:
+            commit_count += 1
+            waiters = list(_waiters)
+        # Commits run on worker threads; the events belong to the event loop.
+        for loop, new_changes in waiters:
+            try:
+                loop.call_soon_threadsafe(new_changes.set)
+            except RuntimeError:
+                # The loop was closed.
+                pass
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changes(session):
+    """
+    Drop the pending notification of a rolled back transaction.
+    """
+    session.info.pop("changes_recorded", None)
+
+
+def _to_response(entry):
+    """
+    Build a dict matching schemas.ChangeResponse from a change log entry.
+    """
+    return {
+        "seq": entry.seq,
+        "entity": entry.entity,
+        "entity_id": entry.entity_id,
+        "op": entry.op,
+        "changed_columns": entry.changed_columns.split(",") if entry.changed_columns else [],
+        "changed_at": entry.changed_at,
+    }
+
+
+def read_changes(db, since, limit, shard_id=None):
+    """
+    Read the change log entries after a sequence number.
+
+    Parameters:
+        db (Session): The database session.
+        since (int): The last sequence number the consumer has seen.
+        limit (int): Maximum number of entries to return.
+        shard_id (str, optional): The shard whose change log to read in sharded mode. Defaults to None.
+
+    Returns:
+        List[dict]: The entries, oldest first, shaped like schemas.ChangeResponse.
+    """
+    query = db.query(ChangeLog)
+    if shard_id is not None:
+        query = query.options(set_shard_id(shard_id))
+    entries = query.filter(ChangeLog.seq > since).order_by(ChangeLog.seq).limit(limit).all()
+    return [_to_response(entry) for entry in entries]
+
+
+def _read_changes_and_release(db, since, limit, shard_id):
+    """
+    Read the change log entries after a sequence number, then hand the session's connection back to the pool.
+    """
+    try:
+        return read_changes(db, since, limit, shard_id)
+    finally:
+        db.rollback()
+
+
+async def wait_for_changes(db, since, limit, timeout, shard_id=None):
+    """
+    Read the change log entries after a sequence number, waiting up to timeout seconds for one to appear.
+
+    Only the reads run in the threadpool; between them the consumer waits on
+    the event loop, so it holds neither a worker thread nor a database connection.
+
+    Parameters:
+        db (Session): The database session.
+        since (int): The last sequence number the consumer has seen.
+        limit (int): Maximum number of entries to return.
+        timeout (float): Maximum number of seconds to wait.
+        shard_id (str, optional): The shard whose change log to read in sharded mode. Defaults to None.
+
+    Returns:
+        List[dict]: The entries, oldest first, shaped like schemas.ChangeResponse.
+    """
+    deadline = time.monotonic() + timeout
+    waiter = (asyncio.get_running_loop(), asyncio.Event())
+    new_changes = waiter[1]
+    with _lock:
+        _waiters.add(waiter)
+    try:
+        while True:
+            # Cleared before reading, so a commit made during the read wakes the next wait.
+            new_changes.clear()
+            changes = await run_in_threadpool(_read_changes_and_release, db, since, limit, shard_id)
+            remaining = deadline - time.monotonic()
+            if changes or remaining <= 0:
+                return changes
+            try:
+                await asyncio.wait_for(new_changes.wait(), min(POLL_INTERVAL, remaining))
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        with _lock:
+            _waiters.discard(waiter)
@@ -1,9 +1,11 @@
+import os
+
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
-# The URL for the database.
-DATABASE_URL = "sqlite:///./car_sales.db"
+# The URL for the database. Can be overridden with the DATABASE_URL environment variable.
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./car_sales.db")
 
 # Create an engine that connects to the database specified by DATABASE_URL.
 engine = create_engine(DATABASE_URL)
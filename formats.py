@@ -0,0 +1,129 @@
+# formats.py
+from datetime import date
+from fastapi import HTTPException, Response
+
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+
+# Accept header values mapped to the media type of the response they select.
+BINARY_MEDIA_TYPES = {
+    ARROW_MEDIA_TYPE: ARROW_MEDIA_TYPE,
+    MSGPACK_MEDIA_TYPE: MSGPACK_MEDIA_TYPE,
+    "application/x-msgpack": MSGPACK_MEDIA_TYPE,
+    "application/vnd.msgpack": MSGPACK_MEDIA_TYPE,
+}
+
+# Extra response content types documented on endpoints that support negotiation.
+BINARY_RESPONSES = {200: {"content": {ARROW_MEDIA_TYPE: {}, MSGPACK_MEDIA_TYPE: {}}}}
+
+
+def negotiate(accept):
+    """
+    Pick a binary response format from an Accept header.
+
+    Parameters:
+        accept (Optional[str]): The value of the Accept header.
+
+    Returns:
+        Optional[str]: The binary media type to respond with, or None to respond with JSON.
+    """
+    if not accept:
+        return None
+    candidates = []
+    for position, part in enumerate(accept.split(",")):
+        media_type, *params = [value.strip() for value in part.split(";")]
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            candidates.append((-quality, position, media_type.lower()))
+    for _, _, media_type in sorted(candidates):
+        if media_type in BINARY_MEDIA_TYPES:
+            return BINARY_MEDIA_TYPES[media_type]
+        if media_type in ("application/json", "*/*", "application/*"):
+            return None
+    return None
+
+
+def _to_columns(keys, rows):
+    """
+    Transpose result rows into a dict of column name to list of values.
+    """
+    columns = {key: [] for key in keys}
+    appends = [columns[key].append for key in keys]
+    for row in rows:
+        for append, value in zip(appends, row):
+            append(value)
+    return columns
+
+
+def _msgpack_default(value):
+    """
+    Encode values MessagePack has no native type for.
+    """
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"Cannot encode {type(value).__name__} as MessagePack")
+
+
+def encode_msgpack(columns):
+    """
+    Encode columns as a MessagePack map of column name to array of values.
+    """
+    try:
+        import msgpack
+    except ImportError:
+        raise HTTPException(status_code=406, detail="MessagePack responses require the msgpack package")
+    return msgpack.packb(columns, default=_msgpack_default)
+
+
+def encode_arrow(columns):
+    """
+    Encode columns as an Apache Arrow IPC stream holding a single record batch.
+    """
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise HTTPException(status_code=406, detail="Arrow responses require the pyarrow package")
+    table = pa.table(columns)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def encode(keys, rows, media_type):
+    """
+    Encode query result rows column by column in the given binary format.
+
+    Parameters:
+        keys (List[str]): The column names.
+        rows (Iterable[tuple]): The result rows.
+        media_type (str): ARROW_MEDIA_TYPE or MSGPACK_MEDIA_TYPE.
+
+    Returns:
+        bytes: The encoded columns.
+    """
+    columns = _to_columns(keys, rows)
+    if media_type == ARROW_MEDIA_TYPE:
+        return encode_arrow(columns)
+    return encode_msgpack(columns)
+
+
+def columns_response(keys, rows, media_type):
+    """
+    Build a binary response directly from query result rows, skipping the response models.
+
+    Parameters:
+        keys (List[str]): The column names.
+        rows (Iterable[tuple]): The result rows.
+        media_type (str): ARROW_MEDIA_TYPE or MSGPACK_MEDIA_TYPE.
+
+    Returns:
+        Response: The encoded columns.
+    """
+    return Response(content=encode(keys, rows, media_type), media_type=media_type)
@@ -0,0 +1,228 @@
+# guardrails.py
+"""
+Limits that keep one expensive caller from slowing down everyone else.
+
+- MAX_PAGE_SIZE caps the limit parameter of the list endpoints.
+- STATEMENT_TIMEOUT interrupts any SQLite statement run for a request that
+  takes longer than that many seconds; the request fails with 503.
+- MAX_EXPANSION_ROWS rejects requests whose nested expansions (every car and
+  sale of every dealer, every sale of every customer in the response) would
+  load more rows than that, estimated from the dealer and customer summary
+  tables before anything is loaded.
+- MAX_CONCURRENT_REQUESTS_PER_CLIENT caps the requests one client can have
+  in flight; more are rejected with 429 instead of queueing for the worker's
+  threads.
+"""
+import os
+import sqlite3
+import time
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import Pool
+
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "1000"))
+
+# Seconds a single statement may run for a request. 0 disables the timeout.
+STATEMENT_TIMEOUT = float(os.getenv("STATEMENT_TIMEOUT", "5"))
+
+# Number of SQLite virtual machine instructions between checks of the statement deadline.
+PROGRESS_STEPS = 10000
+
+MAX_EXPANSION_ROWS = int(os.getenv("MAX_EXPANSION_ROWS", "20000"))
+
+# Header identifying the client, e.g. an API key or X-Forwarded-For behind a proxy.
+# Unset uses the client's address.
+CLIENT_ID_HEADER = os.getenv("CLIENT_ID_HEADER", "").lower()
+
+# Requests one client may have in flight at once. 0 disables the limit. Without
+# CLIENT_ID_HEADER every request may come through the same proxy address, so the
+# limit is only on by default when clients are identified by a header.
+MAX_CONCURRENT_REQUESTS_PER_CLIENT = int(
+    os.getenv("MAX_CONCURRENT_REQUESTS_PER_CLIENT", "8" if CLIENT_ID_HEADER else "0")
+)
+
+
+# Statement timeouts
+
+
+def _deadline_passed(info):
+    """
+    SQLite progress handler: a non-zero return value interrupts the running statement.
+    """
+    deadline = info.get("statement_deadline")
+    return 1 if deadline is not None and time.monotonic() > deadline else 0
+
+
+@event.listens_for(Session, "after_begin")
+def _arm_statement_timeout(session, transaction, connection):
+    """
+    Install the deadline check on each connection a request session begins a transaction on.
+    """
+    timeout = session.info.get("statement_timeout")
+    if not timeout:
+        return
+    driver_connection = connection.connection.driver_connection
+    if not isinstance(driver_connection, sqlite3.Connection):
+        return
+    info = connection.info
+    info["statement_timeout"] = timeout
+    driver_connection.set_progress_handler(lambda: _deadline_passed(info), PROGRESS_STEPS)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_statement_clock(conn, cursor, statement, parameters, context, executemany):
+    """
+    Start the deadline of a statement on a connection armed by a request session.
+    """
+    timeout = conn.info.get("statement_timeout")
+    if timeout:
+        conn.info["statement_deadline"] = time.monotonic() + timeout
+
+
+@event.listens_for(Pool, "checkin")
+def _disarm_statement_timeout(dbapi_connection, connection_record):
+    """
+    Remove the deadline check when a connection goes back to the pool.
+    """
+    if connection_record.info.pop("statement_timeout", None) is not None:
+        connection_record.info.pop("statement_deadline", None)
+        dbapi_connection.set_progress_handler(None, PROGRESS_STEPS)
+
+
+async def statement_timeout_handler(request, exc):
+    """
+    Exception handler for sqlalchemy.exc.OperationalError that reports interrupted statements as 503.
+    """
+    if "interrupted" not in str(exc.orig):
+        raise exc
+    return JSONResponse(status_code=503, content={"detail": "Query exceeded the statement timeout"})
+
+
+# Expansion cost
+
+
+def estimate_dealer_rows(db, dealer_ids):
+    """
+    Estimate how many rows expanding dealers with all their cars and sales loads.
+
+    Parameters:
+        db (Session): The database session.
+        dealer_ids (Iterable[int]): The dealers to expand.
+
+    Returns:
+        int: The estimated number of rows.
+    """
+    # Imported here so that importing main in lazy startup mode does not load the models.
+    from models import DealerSummary
+
+    dealer_ids = list({dealer_id for dealer_id in dealer_ids if dealer_id is not None})
+    if not dealer_ids:
+        return 0
+    # Every car is in stock or sold, and every sold car has a sale.
+    counters = db.query(DealerSummary.in_stock_count, DealerSummary.sold_count).filter(
+        DealerSummary.dealer_id.in_(dealer_ids)
+    )
+    return len(dealer_ids) + sum(in_stock + 2 * sold for in_stock, sold in counters)
+
+
+def estimate_customer_rows(db, customer_ids):
+    """
+    Estimate how many rows expanding customers with all their sales, and the sales' cars, loads.
+
+    Parameters:
+        db (Session): The database session.
+        customer_ids (Iterable[int]): The customers to expand.
+
+    Returns:
+        int: The estimated number of rows.
+    """
+    from models import CustomerSummary
+
+    customer_ids = list(set(customer_ids))
+    if not customer_ids:
+        return 0
+    counts = db.query(CustomerSummary.sale_count).filter(CustomerSummary.customer_id.in_(customer_ids))
+    return len(customer_ids) + sum(2 * sale_count for sale_count, in counts)
+
+
+def _check_estimate(estimate):
+    """
+    Reject a request estimated to load more than MAX_EXPANSION_ROWS rows.
+    """
+    if estimate > MAX_EXPANSION_ROWS:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Request would load about {estimate} rows, more than the {MAX_EXPANSION_ROWS} allowed; "
+                   f"request fewer items",
+        )
+
+
+def check_dealer_expansion(db, dealer_ids, rows=0):
+    """
+    Reject a request whose nested dealer expansions would load more than MAX_EXPANSION_ROWS rows.
+
+    Parameters:
+        db (Session): The database session.
+        dealer_ids (Iterable[int]): The dealers the response expands.
+        rows (int, optional): Rows the response loads besides the expansions. Defaults to 0.
+    """
+    _check_estimate(rows + estimate_dealer_rows(db, dealer_ids))
+
+
+def check_customer_expansion(db, customer_ids):
+    """
+    Reject a request whose nested customer sales would load more than MAX_EXPANSION_ROWS rows.
+
+    Parameters:
+        db (Session): The database session.
+        customer_ids (Iterable[int]): The customers the response expands.
+    """
+    _check_estimate(estimate_customer_rows(db, customer_ids))
+
+
+# Per-client concurrency
+
+
+class ClientConcurrencyMiddleware:
+    """
+    ASGI middleware that rejects a client's requests beyond MAX_CONCURRENT_REQUESTS_PER_CLIENT with 429.
+    """
+
+    def __init__(self, app, max_requests=MAX_CONCURRENT_REQUESTS_PER_CLIENT):
+        self.app = app
+        self.max_requests = max_requests
+        self.in_flight = {}
+
+    def client_key(self, scope):
+        """
+        Return the identity of the client sending a request.
+        """
+        if CLIENT_ID_HEADER:
+            for name, value in scope.get("headers", []):
+                if name.decode("latin-1") == CLIENT_ID_HEADER:
+                    return value.decode("latin-1")
+        client = scope.get("client")
+        return client[0] if client else None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.max_requests:
+            await self.app(scope, receive, send)
+            return
+        key = self.client_key(scope)
+        # The counters are only touched on the event loop, so they need no lock.
+        if self.in_flight.get(key, 0) >= self.max_requests:
+            response = JSONResponse(
+                status_code=429, content={"detail": "Too many concurrent requests"}, headers={"Retry-After": "1"}
+            )
+            await response(scope, receive, send)
+            return
+        self.in_flight[key] = self.in_flight.get(key, 0) + 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight[key] -= 1
+            if not self.in_flight[key]:
+                del self.in_flight[key]
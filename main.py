@@ -1,20 +1,85 @@
 # main.py
+import os
+import threading
 from fastapi import FastAPI
-from router import router
-from db import Base, engine
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import OperationalError
+from db import engine
+from guardrails import ClientConcurrencyMiddleware, statement_timeout_handler
+
+# "eager" (default) imports every route and runs create_all at import time.
+# "lazy" only checks the stored schema version at boot and defers importing the
+# routes, models and schemas until the first request arrives.
+STARTUP_MODE = os.getenv("STARTUP_MODE", "eager")
+
+# Comma-separated shard database URLs; see shards.py. Unset runs on DATABASE_URL alone.
+SHARDED = bool(os.getenv("SHARD_URLS"))
 
 app = FastAPI()
+app.add_middleware(ClientConcurrencyMiddleware)
+app.add_exception_handler(OperationalError, statement_timeout_handler)
+
+_routes_lock = threading.Lock()
+_routes_loaded = False
+
+
+def include_routes():
+    """
+    Import the router and include it in the app, once.
+    """
+    global _routes_loaded
+    if _routes_loaded:
+        return
+    with _routes_lock:
+        if not _routes_loaded:
+            from router import router
+            app.include_router(router)
+            _routes_loaded = True
 
 
-def create_tables():
+class LazyRoutesMiddleware:
     """
-    Function to create database tables.
+    ASGI middleware that includes the routes on the first HTTP request.
     """
-    Base.metadata.create_all(bind=engine)
 
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] in ("http", "websocket"):
+            include_routes()
+        await self.app(scope, receive, send)
+
+
+if STARTUP_MODE == "lazy":
+    from migrations import ensure_schema
+
+    app.add_middleware(LazyRoutesMiddleware)
+    if SHARDED:
+        import shards
+
+        shards.prepare(ensure_schema)
+    else:
+        ensure_schema(engine)
+else:
+    from migrations import upgrade
+
+    # Include the router
+    include_routes()
+    # Create the tables and stamp the schema version
+    if SHARDED:
+        import shards
+
+        shards.prepare(upgrade)
+    else:
+        upgrade(engine)
 
-# Include the router
-app.include_router(router)
+if SHARDED:
+    from shards import DealerMovingError
 
-# Create the tables
-create_tables()
+    @app.exception_handler(DealerMovingError)
+    async def dealer_moving_handler(request, exc):
+        """
+        Ask clients to retry writes to a dealer while it is moved between shards.
+        """
+        return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
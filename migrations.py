@@ -0,0 +1,141 @@
+# migrations.py
+from sqlalchemy import text
+from db import Base
+
+# The version of the schema defined in models.py. Bump this whenever a table,
+# column or index is added so that existing databases get upgraded at startup.
+SCHEMA_VERSION = 6
+
+
+def get_schema_version(engine):
+    """
+    Read the schema version stored in the database.
+
+    SQLite keeps this in the file header (PRAGMA user_version), so reading it
+    does not reflect any tables.
+
+    Parameters:
+        engine (Engine): The engine to read the version from.
+
+    Returns:
+        int: The stored schema version, 0 for a database that was never stamped.
+    """
+    with engine.connect() as conn:
+        return conn.execute(text("PRAGMA user_version")).scalar()
+
+
+def set_schema_version(engine, version):
+    """
+    Store the schema version in the database.
+
+    Parameters:
+        engine (Engine): The engine to stamp.
+        version (int): The schema version to store.
+    """
+    with engine.begin() as conn:
+        conn.execute(text(f"PRAGMA user_version = {int(version)}"))
+
+
+def _add_column(conn, table, column, ddl):
+    """
+    Add a column to an existing table unless create_all already created it.
+    """
+    columns = [row[1] for row in conn.execute(text(f"PRAGMA table_info({table})"))]
+    if column not in columns:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+
+
+def _v2_dealer_summaries(conn):
+    """
+    Add cars.listed_date for the new dealer_summaries table.
+
+    The table is filled by _v6_car_sold_date, which every upgrade from here runs as well.
+    """
+    _add_column(conn, "cars", "listed_date", "DATE")
+
+
+def _v3_sale_partitions(conn):
+    """
+    Index sales by date so that period queries on the hot table use an index scan.
+    """
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_sales_sale_date ON sales (sale_date)"))
+
+
+def _v5_customer_summaries(conn):
+    """
+    Index sales by customer and date, and fill the new customer_summaries table.
+    """
+    from summaries import rebuild_customer_summaries
+
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_sales_customer_id_sale_date ON sales (customer_id, sale_date)"
+    ))
+    rebuild_customer_summaries(conn)
+
+
+def _v6_car_sold_date(conn):
+    """
+    Add cars.sold_date, fill it from the sales table and the archives, and recount the dealer summaries.
+    """
+    from partitions import read_archived_car_sales
+    from summaries import rebuild_dealer_summaries
+
+    _add_column(conn, "cars", "sold_date", "DATE")
+    conn.execute(text(
+        "UPDATE cars SET sold_date = (SELECT min(s.sale_date) FROM sales s WHERE s.car_id = cars.id) "
+        "WHERE sold_date IS NULL"
+    ))
+    for path in conn.execute(text("SELECT path FROM sale_partitions")).scalars().all():
+        car_sales = read_archived_car_sales(path)
+        if car_sales:
+            conn.execute(
+                text("UPDATE cars SET sold_date = :sale_date WHERE id = :car_id AND sold_date IS NULL"), car_sales
+            )
+    rebuild_dealer_summaries(conn)
+
+
+# Steps run, in order, to bring a database from the previous version up to the key.
+# Tables are created by create_all before these run; steps only alter existing
+# tables and backfill data, and must be safe on a freshly created database.
+MIGRATIONS = {
+    2: [_v2_dealer_summaries],
+    3: [_v3_sale_partitions],
+    4: [],  # change_log is a new table, created by create_all.
+    5: [_v5_customer_summaries],
+    6: [_v6_car_sold_date],
+}
+
+
+def upgrade(engine):
+    """
+    Create any missing tables, run pending migrations and stamp the database with SCHEMA_VERSION.
+
+    Parameters:
+        engine (Engine): The engine to upgrade.
+    """
+    # Importing models registers every table on Base.metadata.
+    import models  # noqa: F401
+
+    current = get_schema_version(engine)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        for version in range(current + 1, SCHEMA_VERSION + 1):
+            for step in MIGRATIONS.get(version, []):
+                step(conn)
+    set_schema_version(engine, SCHEMA_VERSION)
+
+
+def ensure_schema(engine):
+    """
+    Upgrade the database only if its stored schema version is out of date.
+
+    Parameters:
+        engine (Engine): The engine to check.
+
+    Returns:
+        bool: True if an upgrade was run, False if the schema was already current.
+    """
+    if get_schema_version(engine) >= SCHEMA_VERSION:
+        return False
+    upgrade(engine)
+    return True
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey
+from datetime import date, datetime
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from db import Base
 
@@ -38,6 +39,8 @@ class Car(Base):
         color (str): The color of the car.
         vin (str): The Vehicle Identification Number (VIN) of the car.
         price (float): The price of the car.
+        listed_date (Date): The date the car was added to the dealer's inventory.
+        sold_date (Date): The date the car was sold, None while it is in stock. Kept when the sale is archived.
         dealer_id (int): The foreign key to associate the car with a dealer.
         dealer (relationship): Relationship to the dealer associated with this car.
         sale (relationship): Relationship to the sale associated with this car.
@@ -51,6 +54,8 @@ class Car(Base):
     color = Column(String)
     vin = Column(String, unique=True, index=True)
     price = Column(Float)
+    listed_date = Column(Date, default=date.today)
+    sold_date = Column(Date)
 
     dealer_id = Column(Integer, ForeignKey("dealers.id"))
     dealer = relationship("Dealer", back_populates="cars")
@@ -97,9 +102,13 @@ class Sale(Base):
         customer (relationship): Relationship to the customer associated with this sale.
     """
     __tablename__ = "sales"
+    __table_args__ = (
+        # Serves a customer's purchase history in date order without scanning their other sales.
+        Index("ix_sales_customer_id_sale_date", "customer_id", "sale_date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    sale_date = Column(Date)
+    sale_date = Column(Date, index=True)
     sale_amount = Column(Float)
     payment_method = Column(String)
 
@@ -111,3 +120,100 @@ class Sale(Base):
 
     customer_id = Column(Integer, ForeignKey("customers.id"))
     customer = relationship("Customer", back_populates="sales")
+
+
+class SalePartition(Base):
+    """
+    Represents a closed year of sales moved out of the sales table into a read-only archive file.
+
+    Attributes:
+        year (int): The calendar year of the archived sales.
+        path (str): The path of the SQLite file holding the archived sales.
+        row_count (int): The number of sales in the archive.
+        min_id (int): The smallest sale ID in the archive.
+        max_id (int): The largest sale ID in the archive.
+        archived_at (Date): The date the year was archived.
+    """
+    __tablename__ = "sale_partitions"
+
+    year = Column(Integer, primary_key=True)
+    path = Column(String, nullable=False)
+    row_count = Column(Integer, nullable=False)
+    min_id = Column(Integer)
+    max_id = Column(Integer)
+    archived_at = Column(Date, default=date.today)
+
+
+class DealerSummary(Base):
+    """
+    Precomputed inventory and sales counters for a dealer, maintained on write.
+
+    Attributes:
+        dealer_id (int): The dealer these counters belong to.
+        in_stock_count (int): Number of the dealer's cars that have not been sold.
+        sold_count (int): Number of the dealer's cars that have been sold.
+        inventory_value (float): Total price of the dealer's cars that have not been sold.
+        month_start (Date): First day of the month the monthly counters refer to.
+        month_sales_count (int): Number of sales made by the dealer in that month.
+        month_sales_amount (float): Total amount of the sales made by the dealer in that month.
+        days_to_sell_total (int): Sum of days between listing and sale for sold cars.
+        days_to_sell_count (int): Number of sold cars counted in days_to_sell_total.
+    """
+    __tablename__ = "dealer_summaries"
+
+    dealer_id = Column(Integer, ForeignKey("dealers.id"), primary_key=True)
+    in_stock_count = Column(Integer, default=0, nullable=False)
+    sold_count = Column(Integer, default=0, nullable=False)
+    inventory_value = Column(Float, default=0.0, nullable=False)
+    month_start = Column(Date)
+    month_sales_count = Column(Integer, default=0, nullable=False)
+    month_sales_amount = Column(Float, default=0.0, nullable=False)
+    days_to_sell_total = Column(Integer, default=0, nullable=False)
+    days_to_sell_count = Column(Integer, default=0, nullable=False)
+
+
+class CustomerSummary(Base):
+    """
+    Lifetime purchase totals of a customer, maintained on write.
+
+    Attributes:
+        customer_id (int): The customer these totals belong to.
+        sale_count (int): Number of sales made to the customer.
+        total_spent (float): Total amount of the sales made to the customer.
+        first_purchase_date (Date): Date of the customer's earliest sale.
+        last_purchase_date (Date): Date of the customer's latest sale.
+    """
+    __tablename__ = "customer_summaries"
+
+    customer_id = Column(Integer, ForeignKey("customers.id"), primary_key=True)
+    sale_count = Column(Integer, default=0, nullable=False)
+    total_spent = Column(Float, default=0.0, nullable=False)
+    first_purchase_date = Column(Date)
+    last_purchase_date = Column(Date)
+
+
+class ChangeLog(Base):
+    """
+    Represents one insert, update or delete of a dealer, car, customer or sale.
+
+    Rows are written in the same transaction as the change they describe and
+    numbered by a strictly increasing sequence, so consumers can sync by
+    reading every entry after the last sequence number they saw.
+
+    Attributes:
+        seq (int): The sequence number of the change.
+        entity (str): The table of the changed row.
+        entity_id (int): The ID of the changed row.
+        op (str): The kind of change: "insert", "update" or "delete".
+        changed_columns (str): Comma-separated names of the columns that were set or changed.
+        changed_at (DateTime): When the change was made (UTC).
+    """
+    __tablename__ = "change_log"
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    seq = Column(Integer, primary_key=True)
+    entity = Column(String, nullable=False)
+    entity_id = Column(Integer, nullable=False)
+    op = Column(String, nullable=False)
+    changed_columns = Column(String, nullable=False, default="")
+    changed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -0,0 +1,433 @@
+# partitions.py
+"""
+Year-based partitioning of sales.
+
+The sales table only holds the hot, open periods. Closed years can be moved
+into one read-only SQLite file per year with `python partitions.py archive <year>`;
+the sale_partitions table records which years live where. Archive files are
+only opened when a read path asks for archived data, so queries on recent
+sales never touch them.
+"""
+import argparse
+import os
+import sqlite3
+from collections import namedtuple
+from datetime import date
+from sqlalchemy import func, select, text
+from models import Car, Customer, Dealer, Sale, SalePartition
+from shards import SHARDING_ENABLED
+
+# The directory archive files are written to.
+ARCHIVE_DIR = os.getenv("SALES_ARCHIVE_DIR", "./sales_archive")
+
+SALE_COLUMNS = "id, sale_date, sale_amount, payment_method, dealer_id, car_id, customer_id"
+
+# A sale row read from an archive, with the columns of the sales table.
+ArchivedSale = namedtuple("ArchivedSale", SALE_COLUMNS.split(", "))
+
+
+def archive_path(year):
+    """
+    Return the absolute path of the archive file for a year.
+    """
+    return os.path.abspath(os.path.join(ARCHIVE_DIR, f"sales_{year}.db"))
+
+
+def is_archived(db, sale_date):
+    """
+    Check whether the period containing sale_date has been archived and is read-only.
+
+    Parameters:
+        db (Session): The database session.
+        sale_date (date): The date to check.
+
+    Returns:
+        bool: True if the sale's year lives in an archive.
+    """
+    return sale_date is not None and db.get(SalePartition, sale_date.year) is not None
+
+
+def next_sale_id(db):
+    """
+    Return the ID to use for a new sale, or None to let the database choose.
+
+    SQLite hands out max(id) + 1, which could reuse IDs of archived sales when
+    the newest sales were archived. In that case the next ID continues after
+    the largest archived one.
+
+    Parameters:
+        db (Session): The database session.
+
+    Returns:
+        Optional[int]: The ID to assign, or None.
+    """
+    archived_max = db.query(func.max(SalePartition.max_id)).scalar()
+    if archived_max is None:
+        return None
+    hot_max = db.query(func.max(Sale.id)).scalar() or 0
+    return archived_max + 1 if archived_max >= hot_max else None
+
+
+def archives_enabled():
+    """
+    Check whether sales can live in archives.
+
+    Archives belong to the main database; sales of a sharded deployment are never archived.
+
+    Returns:
+        bool: True unless sharding is on.
+    """
+    return not SHARDING_ENABLED
+
+
+def _archives(db):
+    """
+    Return the archived partitions, oldest year first.
+    """
+    return db.query(SalePartition).order_by(SalePartition.year).all()
+
+
+def _read_archive(path, sql, params=()):
+    """
+    Run a query on one archive file over its own short-lived connection.
+
+    Archives are not attached to the session's connection, since SQLite allows
+    at most 10 attached databases and there is one archive per year.
+
+    Parameters:
+        path (str): The path of the archive file.
+        sql (str): The query, on the archive's sales table.
+        params (optional): The query parameters. Defaults to none.
+
+    Returns:
+        List[tuple]: The result rows.
+    """
+    # Archives never change once written, so they can be opened immutable (no locking).
+    archive = sqlite3.connect(f"file:{path}?mode=ro&immutable=1", uri=True)
+    try:
+        return archive.execute(sql, params).fetchall()
+    finally:
+        archive.close()
+
+
+def _query_archive(partition, sql, params=()):
+    """
+    Select sale rows from one archived year.
+
+    Parameters:
+        partition (SalePartition): The archived year to read.
+        sql (str): A query selecting SALE_COLUMNS from the archive's sales table.
+        params (optional): The query parameters. Defaults to none.
+
+    Returns:
+        List[ArchivedSale]: The sale rows.
+    """
+    rows = _read_archive(partition.path, sql, params)
+    return [ArchivedSale(sale_id, date.fromisoformat(sale_date), *rest) for sale_id, sale_date, *rest in rows]
+
+
+def read_archived_car_sales(path):
+    """
+    Read the car and date of every sale in an archive file.
+
+    Parameters:
+        path (str): The path of the archive file.
+
+    Returns:
+        List[dict]: The car_id and sale_date of each archived sale of a car.
+    """
+    rows = _read_archive(path, "SELECT car_id, sale_date FROM sales WHERE car_id IS NOT NULL")
+    return [{"car_id": car_id, "sale_date": sale_date} for car_id, sale_date in rows]
+
+
+def read_archived_customer_totals(conn, customer_ids=None):
+    """
+    Total the archived sales of customers, one row per customer and archived year.
+
+    Parameters:
+        conn (Connection): A connection to the main database.
+        customer_ids (Iterable[int], optional): The customers to total. Defaults to None, every customer.
+
+    Returns:
+        List[dict]: The customer_id, sale_count, total_spent, first_purchase_date and last_purchase_date
+        of each customer's sales in each archive.
+    """
+    if not archives_enabled():
+        return []
+    where, params = "customer_id IS NOT NULL", ()
+    if customer_ids is not None:
+        params = tuple(customer_ids)
+        if not params:
+            return []
+        where += f" AND customer_id IN ({', '.join('?' * len(params))})"
+    sql = (
+        f"SELECT customer_id, count(*), coalesce(sum(sale_amount), 0), min(sale_date), max(sale_date) "
+        f"FROM sales WHERE {where} GROUP BY customer_id"
+    )
+    keys = ("customer_id", "sale_count", "total_spent", "first_purchase_date", "last_purchase_date")
+    return [
+        dict(zip(keys, row))
+        for path in conn.execute(select(SalePartition.path)).scalars().all()
+        for row in _read_archive(path, sql, params)
+    ]
+
+
+def get_archived_purchase_dates(db, customer_id):
+    """
+    Find a customer's first and last purchase dates among the archived sales.
+
+    Parameters:
+        db (Session): The database session.
+        customer_id (int): The ID of the customer.
+
+    Returns:
+        Tuple[Optional[date], Optional[date]]: The first and last archived sale dates, None without archived sales.
+    """
+    if not archives_enabled():
+        return None, None
+    dates = [
+        date.fromisoformat(day)
+        for partition in _archives(db)
+        for row in _read_archive(
+            partition.path, "SELECT min(sale_date), max(sale_date) FROM sales WHERE customer_id = ?", (customer_id,)
+        )
+        for day in row
+        if day is not None
+    ]
+    return (min(dates), max(dates)) if dates else (None, None)
+
+
+def _to_response(db, row):
+    """
+    Build a dict matching schemas.SaleResponse from a raw sale row.
+    """
+    return {
+        "id": row.id,
+        "sale_date": row.sale_date,
+        "sale_amount": row.sale_amount,
+        "payment_method": row.payment_method,
+        "dealer": db.get(Dealer, row.dealer_id) if row.dealer_id is not None else None,
+        "car": db.get(Car, row.car_id) if row.car_id is not None else None,
+        "customer": db.get(Customer, row.customer_id) if row.customer_id is not None else None,
+    }
+
+
+def get_archived_sales(db, sale_ids):
+    """
+    Look up sales in the archives by ID.
+
+    Parameters:
+        db (Session): The database session.
+        sale_ids (Iterable[int]): The IDs to look up.
+
+    Returns:
+        Dict[int, dict]: The archived sales found, keyed by ID, shaped like schemas.SaleResponse.
+    """
+    sale_ids = set(sale_ids)
+    if not sale_ids or not archives_enabled():
+        return {}
+    found = {}
+    for partition in _archives(db):
+        wanted = [
+            sale_id for sale_id in sale_ids
+            if partition.min_id is not None and partition.min_id <= sale_id <= partition.max_id
+        ]
+        if not wanted:
+            continue
+        placeholders = ", ".join("?" * len(wanted))
+        for row in _query_archive(partition, f"SELECT {SALE_COLUMNS} FROM sales WHERE id IN ({placeholders})", wanted):
+            found[row.id] = _to_response(db, row)
+    return found
+
+
+def get_archived_sale(db, sale_id):
+    """
+    Look up a single sale in the archives by ID.
+
+    Parameters:
+        db (Session): The database session.
+        sale_id (int): The ID of the sale.
+
+    Returns:
+        Optional[dict]: The archived sale shaped like schemas.SaleResponse, or None.
+    """
+    return get_archived_sales(db, [sale_id]).get(sale_id)
+
+
+def get_archived_customer_sales(db, customer_id, limit, since=None, until=None, before=None):
+    """
+    Select a customer's newest sales in the archives, newest first.
+
+    Only the archives of years that overlap the requested dates are read.
+
+    Parameters:
+        db (Session): The database session.
+        customer_id (int): The ID of the customer.
+        limit (int): Maximum number of sales to return.
+        since (date, optional): Only include sales on or after this date. Defaults to None.
+        until (date, optional): Only include sales on or before this date. Defaults to None.
+        before (Tuple[date, int], optional): Only include sales ordered before this (sale_date, id). Defaults to None.
+
+    Returns:
+        list: The sale rows, with the columns of the sales table.
+    """
+    if not archives_enabled():
+        return []
+    latest = min(day for day in (until, before[0] if before else None, date.max) if day is not None)
+    conditions = ["customer_id = :customer_id"]
+    params = {"customer_id": customer_id, "limit": limit}
+    if since is not None:
+        conditions.append("sale_date >= :since")
+        params["since"] = since.isoformat()
+    if until is not None:
+        conditions.append("sale_date <= :until")
+        params["until"] = until.isoformat()
+    if before is not None:
+        conditions.append("(sale_date, id) < (:before_date, :before_id)")
+        params["before_date"], params["before_id"] = before[0].isoformat(), before[1]
+    sql = (
+        f"SELECT {SALE_COLUMNS} FROM sales WHERE {' AND '.join(conditions)} "
+        f"ORDER BY sale_date DESC, id DESC LIMIT :limit"
+    )
+    rows = []
+    for partition in reversed(_archives(db)):
+        # Every older year's sales sort after the ones already found.
+        if len(rows) >= limit or (since is not None and partition.year < since.year):
+            break
+        if date(partition.year, 1, 1) <= latest:
+            rows += _query_archive(partition, sql, params)
+    return rows[:limit]
+
+
+def select_sales(db, skip, limit):
+    """
+    Select raw sale rows across the sales table and every archive, ordered by ID.
+
+    Parameters:
+        db (Session): The database session.
+        skip (int): Number of sales to skip.
+        limit (int): Maximum number of sales to return.
+
+    Returns:
+        Tuple[List[str], List[tuple]]: The column names and the sale rows.
+    """
+    wanted = skip + limit
+    rows = db.execute(select(*Sale.__table__.columns).order_by(Sale.id).limit(wanted)).all()
+    sql = f"SELECT {SALE_COLUMNS} FROM sales ORDER BY id LIMIT ?"
+    for partition in sorted(_archives(db), key=lambda partition: partition.min_id or 0):
+        # Archives starting after the last ID of a full page cannot add to it.
+        if partition.min_id is None or (len(rows) >= wanted and partition.min_id > rows[wanted - 1].id):
+            continue
+        rows = sorted(rows + _query_archive(partition, sql, (wanted,)), key=lambda row: row.id)[:wanted]
+    return list(ArchivedSale._fields), rows[skip:]
+
+
+def list_sales(db, skip, limit):
+    """
+    List sales across the sales table and every archive, ordered by ID.
+
+    Parameters:
+        db (Session): The database session.
+        skip (int): Number of sales to skip.
+        limit (int): Maximum number of sales to return.
+
+    Returns:
+        List[dict]: The sales, shaped like schemas.SaleResponse.
+    """
+    _, rows = select_sales(db, skip, limit)
+    return [_to_response(db, row) for row in rows]
+
+
+def archive_year(engine, year):
+    """
+    Move every sale of a closed year out of the sales table into a read-only archive file.
+
+    The sales are copied into the archive, deleted from the sales table and the
+    partition is recorded in one transaction that holds the write lock from the
+    start, so no write to the year can slip in between and readers see each
+    sale in exactly one place. Writes wait for the archival to finish. Cars
+    keep the sold_date of their archived sale, so they still count as sold.
+
+    Parameters:
+        engine (Engine): The engine of the main database.
+        year (int): The year to archive.
+
+    Returns:
+        int: The number of sales archived.
+    """
+    if year >= date.today().year:
+        raise ValueError(f"{year} is not a closed period")
+    path = archive_path(year)
+    if os.path.exists(path):
+        raise ValueError(f"{path} already exists")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    period = {"start": date(year, 1, 1).isoformat(), "end": date(year + 1, 1, 1).isoformat()}
+    in_period = "sale_date >= :start AND sale_date < :end"
+
+    try:
+        with engine.connect() as conn:
+            conn.exec_driver_sql("ATTACH DATABASE ? AS archive", (path,))
+            try:
+                conn.execute(text(
+                    "CREATE TABLE archive.sales (id INTEGER NOT NULL PRIMARY KEY, sale_date DATE, "
+                    "sale_amount FLOAT, payment_method VARCHAR, dealer_id INTEGER, car_id INTEGER, "
+                    "customer_id INTEGER)"
+                ))
+                conn.exec_driver_sql("BEGIN IMMEDIATE")
+                conn.execute(text(
+                    f"INSERT INTO archive.sales SELECT {SALE_COLUMNS} FROM main.sales WHERE {in_period} ORDER BY id"
+                ), period)
+                # Indexes built after the copy come out compact.
+                conn.execute(text("CREATE INDEX archive.ix_sales_sale_date ON sales (sale_date)"))
+                conn.execute(text(
+                    "CREATE INDEX archive.ix_sales_customer_id_sale_date ON sales (customer_id, sale_date)"
+                ))
+                count, min_id, max_id = conn.execute(
+                    text("SELECT count(*), min(id), max(id) FROM archive.sales")
+                ).one()
+                conn.execute(text(f"DELETE FROM main.sales WHERE {in_period}"), period)
+                conn.execute(
+                    SalePartition.__table__.insert().values(
+                        year=year, path=path, row_count=count, min_id=min_id, max_id=max_id,
+                        archived_at=date.today(),
+                    )
+                )
+                conn.commit()
+            finally:
+                conn.rollback()
+                conn.exec_driver_sql("DETACH DATABASE archive")
+    except Exception:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    os.chmod(path, 0o444)
+    return count
+
+
+def main():
+    """
+    Command line entry point: `python partitions.py archive <year>` or `python partitions.py list`.
+    """
+    from db import engine
+    from migrations import ensure_schema
+
+    parser = argparse.ArgumentParser(description="Manage archived sales periods.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    archive = commands.add_parser("archive", help="Move a closed year of sales into a read-only archive.")
+    archive.add_argument("year", type=int)
+    commands.add_parser("list", help="List archived years.")
+    args = parser.parse_args()
+
+    ensure_schema(engine)
+    if args.command == "archive":
+        count = archive_year(engine, args.year)
+        print(f"Archived {count} sales from {args.year} to {archive_path(args.year)}")
+    else:
+        with engine.connect() as conn:
+            for partition in conn.execute(select(SalePartition).order_by(SalePartition.year)):
+                print(f"{partition.year}\t{partition.row_count} sales\t{partition.path}")
+
+
+if __name__ == "__main__":
+    main()
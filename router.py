@@ -1,18 +1,149 @@
 # router.py
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from datetime import date
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from sqlalchemy import select, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, selectinload
 from models import Dealer, Car, Customer, Sale
 from schemas import (
-    DealerCreate, DealerUpdate, DealerResponse,
-    CarCreate, CarUpdate, CarResponse, CarListResponse,
-    CustomerCreate, CustomerUpdate, CustomerResponse,
-    SaleCreate, SaleUpdate, SaleResponse, SaleListResponse
+    DealerCreate, DealerUpdate, DealerResponse, DealerSummaryResponse, DealerBatchResponse,
+    CarCreate, CarUpdate, CarResponse, CarListResponse, CarBatchResponse,
+    CustomerCreate, CustomerUpdate, CustomerResponse, CustomerBatchResponse, CustomerSalesResponse,
+    SaleCreate, SaleUpdate, SaleResponse, SaleListResponse, SaleBatchResponse,
+    BatchGetRequest, MAX_BATCH_IDS, ChangeFeedResponse
 )
 from session import get_db
+import changes
+import formats
+import guardrails
+import partitions
+import shards
+import summaries
+import vins
 
 router = APIRouter()
 
+# Eager loads matching the nesting of each response schema, so a batch read
+# issues a fixed number of queries however many IDs are requested.
+SALE_RESPONSE_LOADS = (selectinload(Sale.dealer), selectinload(Sale.car), selectinload(Sale.customer))
+DEALER_RESPONSE_LOADS = (
+    selectinload(Dealer.cars),
+    selectinload(Dealer.sales).options(selectinload(Sale.car), selectinload(Sale.customer)),
+)
+CAR_RESPONSE_LOADS = (selectinload(Car.dealer).options(*DEALER_RESPONSE_LOADS),)
+CUSTOMER_RESPONSE_LOADS = (
+    selectinload(Customer.sales).options(selectinload(Sale.dealer), selectinload(Sale.car)),
+)
+
+
+def list_page(db: Session, model, skip: int, limit: int):
+    """
+    Load a page of a model, merged across shards in sharded mode.
+
+    Parameters:
+        db (Session): The database session.
+        model: The model class to list.
+        skip (int): Number of rows to skip.
+        limit (int): Maximum number of rows to return.
+
+    Returns:
+        list: The rows of the page.
+    """
+    if shards.SHARDING_ENABLED:
+        return shards.paginate(db, model, skip, limit)
+    return db.query(model).offset(skip).limit(limit).all()
+
+
+def columns_page(db: Session, model, skip: int, limit: int):
+    """
+    Select a page of a model's table columns, merged across shards in sharded mode.
+
+    Parameters:
+        db (Session): The database session.
+        model: The model class to list.
+        skip (int): Number of rows to skip.
+        limit (int): Maximum number of rows to return.
+
+    Returns:
+        Tuple[List[str], Iterable[tuple]]: The column names and the rows.
+    """
+    if shards.SHARDING_ENABLED:
+        return shards.select_columns_page(model, skip, limit)
+    result = db.execute(select(*model.__table__.columns).offset(skip).limit(limit))
+    return list(result.keys()), result
+
+
+def parse_ids(ids: str) -> List[int]:
+    """
+    Parse a comma-separated list of IDs from a query string.
+
+    Parameters:
+        ids (str): The IDs, e.g. "1,2,3".
+
+    Returns:
+        List[int]: The parsed IDs, in order.
+    """
+    try:
+        parsed = [int(value) for value in ids.split(",") if value.strip()]
+    except ValueError:
+        raise HTTPException(status_code=422, detail="ids must be a comma-separated list of integers")
+    if len(parsed) > MAX_BATCH_IDS:
+        raise HTTPException(status_code=422, detail=f"At most {MAX_BATCH_IDS} ids can be requested at once")
+    return parsed
+
+
+def get_by_ids(db: Session, model, ids: List[int], loads=()):
+    """
+    Fetch many rows of a model by ID with a single IN query.
+
+    Parameters:
+        db (Session): The database session.
+        model: The model class to query.
+        ids (List[int]): The IDs to fetch.
+        loads (tuple, optional): Loader options to apply. Defaults to ().
+
+    Returns:
+        Dict[int, model]: The rows found, keyed by ID.
+    """
+    unique_ids = list(dict.fromkeys(ids))
+    if not unique_ids:
+        return {}
+    rows = db.query(model).options(*loads).filter(model.id.in_(unique_ids)).all()
+    return {row.id: row for row in rows}
+
+
+def batch_response(ids: List[int], found: dict):
+    """
+    Arrange batch results in request order and list the IDs that were not found.
+
+    Parameters:
+        ids (List[int]): The requested IDs.
+        found (dict): The rows found, keyed by ID.
+
+    Returns:
+        dict: The items in request order and the missing IDs.
+    """
+    return {
+        "items": [found[item_id] for item_id in ids if item_id in found],
+        "missing": [item_id for item_id in dict.fromkeys(ids) if item_id not in found],
+    }
+
+
+def check_car_expansion(db: Session, ids: List[int]):
+    """
+    Reject a batch of cars whose nested dealers would load too many rows, before loading the cars.
+
+    Parameters:
+        db (Session): The database session.
+        ids (List[int]): The IDs of the requested cars.
+    """
+    unique_ids = list(dict.fromkeys(ids))
+    if unique_ids:
+        dealer_ids = db.execute(select(Car.dealer_id).where(Car.id.in_(unique_ids))).scalars().all()
+        guardrails.check_dealer_expansion(db, dealer_ids, len(unique_ids))
+
+
 # Dealer routes
 
 
@@ -30,28 +161,77 @@ def create_dealer(dealer: DealerCreate, db: Session = Depends(get_db)):
     """
     db_dealer = Dealer(**dealer.dict())
     db.add(db_dealer)
+    db.flush()
+    summaries.dealer_created(db, db_dealer.id)
     db.commit()
     db.refresh(db_dealer)
     return db_dealer
 
 
-@router.get("/dealers/", response_model=List[DealerResponse])
-def get_all_dealers(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
+@router.get("/dealers/", response_model=List[DealerResponse], responses=formats.BINARY_RESPONSES)
+def get_all_dealers(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1, le=guardrails.MAX_PAGE_SIZE),
+    accept: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+):
     """
     Get a list of all dealers.
 
+    Responds with the dealers table's columns as Apache Arrow IPC or MessagePack
+    instead of JSON when the Accept header asks for it.
+
     Parameters:
         skip (int, optional): Number of dealers to skip. Defaults to 0.
-        limit (int, optional): Maximum number of dealers to return. Defaults to 10.
+        limit (int, optional): Maximum number of dealers to return, at most MAX_PAGE_SIZE. Defaults to 10.
+        accept (str, optional): The Accept header. Defaults to None.
         db (Session, optional): The database session dependency. Defaults to Depends(get_db()).
 
     Returns:
         List[schemas.DealerResponse]: List of dealers.
     """
-    dealers = db.query(Dealer).offset(skip).limit(limit).all()
+    media_type = formats.negotiate(accept)
+    if media_type is not None:
+        keys, rows = columns_page(db, Dealer, skip, limit)
+        return formats.columns_response(keys, rows, media_type)
+    dealers = list_page(db, Dealer, skip, limit)
+    guardrails.check_dealer_expansion(db, [dealer.id for dealer in dealers])
     return dealers
 
 
+@router.get("/dealers/batch", response_model=DealerBatchResponse)
+def get_dealers_batch(ids: str, db: Session = Depends(get_db)):
+    """
+    Get many dealers by ID.
+
+    Parameters:
+        ids (str): Comma-separated IDs of the dealers to retrieve, e.g. "1,2,3".
+        db (Session, optional): The database session dependency. Defaults to Depends(get_db()).
+
+    Returns:
+        schemas.DealerBatchResponse: The dealers found, in request order, and the IDs that were not found.
+    """
+    ids = parse_ids(ids)
+    guardrails.check_dealer_expansion(db, ids)
+    return batch_response(ids, get_by_ids(db, Dealer, ids, DEALER_RESPONSE_LOADS))
+
+
+@router.post("/dealers/batch-get", response_model=DealerBatchResponse)
+def batch_get_dealers(request: BatchGetRequest, db: Session = Depends(get_db)):
+    """
+    Get many dealers by ID, with the IDs in the request body.
+
+    Parameters:
+        request (schemas.BatchGetRequest): The IDs of the dealers to retrieve.
+        db (Session, optional): The database session dependency. Defaults to Depends(get_db()).
+
+    Returns:
+        schemas.DealerBatchResponse: The dealers found, in request order, and the IDs that were not found.
+    """
+    guardrails.check_dealer_expansion(db, request.ids)
+    return batch_response(request.ids, get_by_ids(db, Dealer, request.ids, DEALER_RESPONSE_LOADS))
+
+
 @router.get("/dealers/{dealer_id}", response_model=DealerResponse)
 def read_dealer(dealer_id: int, db: Session = Depends(get_db)):
     """
@@ -64,12 +244,34 @@ def read_dealer(dealer_id: int, db: Session = Depends(get_db)):
     Returns:
         schemas.DealerResponse: Details of the requested dealer.
     """
+    guardrails.check_dealer_expansion(db, [dealer_id])
     dealer = db.query(Dealer).filter(Dealer.id == dealer_id).first()
     if dealer is None:
         raise HTTPException(status_code=404, detail="Dealer not found")
     return dealer
 
 
+@router.get("/dealers/{dealer_id}/summary", response_model=DealerSummaryResponse)
+def read_dealer_summary(dealer_id: int, db: Session = Depends(get_db)):
+    """
+    Get a dealer's inventory and sales summary.
+
+    The counters are maintained on every car and sale write, so this is a
+    single-row lookup regardless of how many cars and sales the dealer has.
+
+    Parameters:
+        dealer_id (int): The ID of the dealer.
+        db (Session, optional): The database session dependency. Defaults to Depends(get_db()).
+
+    Returns:
+        schemas.DealerSummaryResponse: The dealer's summary.
+    """
+    summary = summaries.get_summary(db, dealer_id)
+    if summary is None:
+        raise HTTPException(status_code=404, detail="Dealer not found")
+    return summary
+
+
 @router.put("/dealers/{dealer_id}", response_model=DealerResponse)
 def update_dealer(dealer_id: int, dealer: DealerUpdate, db: Session = Depends(get_db)):
     """
@@ -111,6 +313,7 @@ def delete_dealer(dealer_id: int, db: Session = Depends(get_db)):
     if dealer is None:
         raise HTTPException(status_code=404, detail="Dealer not found")
 
+    summaries.dealer_deleted(db, dealer.id)
     db.delete(dealer)
     db.commit()
     return dealer
@@ -118,6 +321,26 @@ def delete_dealer(dealer_id: int, db: Session = Depends(get_db)):
 # Car routes
 
 
+def flush_car(db: Session):
+    """
+    Flush a new or changed car.
+
+    A car with the same VIN committed by a concurrent request since the VIN
+    pre-check, or in sharded mode held by a car on any shard, is reported as a
+    conflict instead of a server error.
+    """
+    try:
+        db.flush()
+    except shards.DuplicateVinError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="A car with this VIN already exists")
+    except IntegrityError as error:
+        db.rollback()
+        if "vin" not in str(error.orig):
+            raise
+        raise HTTPException(status_code=409, detail="A car with this VIN already exists")
+
+
 @router.post("/cars/", response_model=CarResponse)
 def create_car(car: CarCreate, db: Session = Depends(get_db)):
     """
@@ -130,30 +353,103 @@ def create_car(car: CarCreate, db: Session = Depends(get_db)):
     Returns:
         schemas.CarResponse: The details of the created car.
     """
+    if vins.lookup_car_id(db, car.vin) is not None:
+        raise HTTPException(status_code=409, detail="A car with this VIN already exists")
+
     db_car = Car(**car.dict())
     db.add(db_car)
+    flush_car(db)
+    summaries.car_added(db, db_car)
     db.commit()
     db.refresh(db_car)
     return db_car
 
 
-@router.get("/cars/", response_model=List[CarResponse])
-def get_all_cars(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
+@router.get("/cars/", response_model=List[CarResponse], responses=formats.BINARY_RESPONSES)
+def get_all_cars(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1, le=guardrails.MAX_PAGE_SIZE),
+    accept: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+):
     """
     Get a list of all cars.
 
+    Responds with the cars table's columns as Apache Arrow IPC or MessagePack
+    instead of JSON when the Accept header asks for it.
+
     Parameters:
         skip (int, optional): Number of cars to skip. Defaults to 0.
-        limit (int, optional): Maximum number of cars to return. Defaults to 10.
+        limit (int, optional): Maximum number of cars to return, at most MAX_PAGE_SIZE. Defaults to 10.
+        accept (str, optional): The Accept header. Defaults to None.
         db (Session, optional): The database session dependency. Defaults to Depends(get_db()).
 
     Returns:
         List[schemas.CarResponse]: List of cars.
     """
-    cars = db.query(Car).offset(skip).limit(limit).all()
+    media_type = formats.negotiate(accept)
+    if media_type is not None:
+        keys, rows = columns_page(db, Car, skip, limit)
+        return formats.columns_response(keys, rows, media_type)
+    cars = list_page(db, Car, skip, limit)
+    guardrails.check_dealer_expansion(db, [car.dealer_id for car in cars], len(cars))
     return cars
 
 
+@router.get("/cars/batch", response_model=CarBatchResponse)
+def get_cars_batch(ids: str, db: Session = Depends(get_db)):
+    """
+    Get many cars by ID.
+
+    Parameters:
+        ids (str): Comma-separated IDs of the cars to retrieve, e.g. "1,2,3".
+        db (Session, optional): The database session dependency. Defaults to Depends(get_db()).
+
+    Returns:
+        schemas.CarBatchResponse: The cars found, in request order, and the IDs that were not found.
+    """
+    ids = parse_ids(ids)
+    check_car_expansion(db, ids)
+    return batch_response(ids, get_by_ids(db, Car, ids, CAR_RESPONSE_LOADS))
+
+
+@router.post("/cars/batch-get", response_model=CarBatchResponse)
+def batch_get_cars(request: BatchGetRequest, db: Session = Depends(get_db)):
+    """
+    Get many cars by ID, with the IDs in the request body.
+
+    Parameters:
+        request (schemas.BatchGetRequest): The IDs of the cars to retrieve.
+        db (Session, optional): The database session dependency. Defaults to Depends(get_db()).
+
+    Returns:
+        schemas.CarBatchResponse: The cars found, in request order, and the IDs that were not found.
+    """
+    check_car_expansion(db, request.ids)
+    return batch_response(request.ids, get_by_ids(db, Car, request.ids, CAR_RESPONSE_LOADS))
+
+
+@router.get("/cars/by-vin/{vin}", response_model=CarResponse)
+def read_car_by_vin(vin: str, db: Session = Depends(get_db)):
+    """
+    Get a car by VIN.
+
+    Unknown VINs are answered from the in-process VIN index without querying the cars table.
+
+    Parameters:
+        vin (str): The VIN of the car to retrieve.
+        db (Session, optional): The database session dependency. Defaults to Depends(get_db()).
+
+    Returns:
+        schemas.CarResponse: Details of the requested car.
+    """
+    car = vins.find_car(db, vin)
+    if car is None:
+        raise HTTPException(status_code=404, detail="Car not found")
+    guardrails.check_dealer_expansion(db, [car.dealer_id], 1)
+    return db.query(Car).options(*CAR_RESPONSE_LOADS).populate_existing().filter(Car.id == car.id).one()
+
+
 @router.get("/cars/{car_id}", response_model=CarResponse)
 def read_car(car_id: int, db: Session = Depends(get_db)):
     """
@@ -166,6 +462,7 @@ def read_car(car_id: int, db: Session = Depends(get_db)):
     Returns:
         schemas.CarResponse: Details of the requested car.
     """
+    check_car_expansion(db, [car_id])
     car = db.query(Car).filter(Car.id == car_id).first()
     if car is None:
         raise HTTPException(status_code=404, detail="Car not found")
@@ -189,9 +486,15 @@ def update_car(car_id: int, car: CarUpdate, db: Session = Depends(get_db)):
     if db_car is None:
         raise HTTPException(status_code=404, detail="Car not found")
 
+    if vins.lookup_car_id(db, car.vin) not in (None, db_car.id):
+        raise HTTPException(status_code=409, detail="A car with this VIN already exists")
+
+    old_price = db_car.price
     for key, value in car.dict().items():
         setattr(db_car, key, value)
 
+    flush_car(db)
+    summaries.car_price_changed(db, db_car, old_price)
     db.commit()
     db.refresh(db_car)
     return db_car
@@ -213,6 +516,7 @@ def delete_car(car_id: int, db: Session = Depends(get_db)):
     if car is None:
         raise HTTPException(status_code=404, detail="Car not found")
 
+    summaries.car_removed(db, car)
     db.delete(car)
     db.commit()
     return car
@@ -239,23 +543,75 @@ def create_customer(customer: CustomerCreate, db: Session = Depends(get_db)):
     return db_customer
 
 
-@router.get("/customers/", response_model=List[CustomerResponse])
-def get_all_customers(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
+@router.get("/customers/", response_model=List[CustomerResponse], responses=formats.BINARY_RESPONSES)
+def get_all_customers(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1, le=guardrails.MAX_PAGE_SIZE),
+    accept: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+):
     """
     Get a list of all customers.
 
+    Responds with the customers table's columns as Apache Arrow IPC or MessagePack
+    instead of JSON when the Accept header asks for it.
+
     Parameters:
         skip (int, optional): Number of customers to skip. Defaults to 0.
-        limit (int, optional): Maximum number of customers to return. Defaults to 10.
+        limit (int, optional): Maximum number of customers to return, at most MAX_PAGE_SIZE. Defaults to 10.
+        accept (str, optional): The Accept header. Defaults to None.
         db (Session, optional): The database session dependency. Defaults to Depends(get_db()).
 
     Returns:
         List[schemas.CustomerResponse]: List of customers.
     """
-    customers = db.query(Customer).offset(skip).limit(limit).all()
+    media_type = formats.negotiate(accept)
+    if media_type is not None:
+        keys, rows = columns_page(db, Customer, skip, limit)
+        return formats.columns_response(keys, rows, media_type)
+    customers = list_page(db, Customer, skip, limit)
+    guardrails.check_customer_expansion(db, [customer.id for customer in customers])
+    shards.load_customer_sales(db, customers)
     return customers
 
 
+@router.get("/customers/batch", response_model=CustomerBatchResponse)
+def get_customers_batch(ids: str, db: Session = Depends(get_db)):
+    """
+    Get many customers by ID.
+
+    Parameters:
+        ids (str): Comma-separated IDs of the customers to retrieve, e.g. "1,2,3".
+        db (Session, optional): The database session dependency. Defaults to Depends(get_db()).
+
+    Returns:
+        schemas.CustomerBatchResponse: The customers found, in request order, and the IDs that were not found.
+    """
+    ids = parse_ids(ids)
+    guardrails.check_customer_expansion(db, ids)
+    found = get_by_ids(db, Customer, ids, CUSTOMER_RESPONSE_LOADS)
+    shards.load_customer_sales(db, found.values())
+    return batch_response(ids, found)
+
+
+@router.post("/customers/batch-get", response_model=CustomerBatchResponse)
+def batch_get_customers(request: BatchGetRequest, db: Session = Depends(get_db)):
+    """
+    Get many customers by ID, with the IDs in the request body.
+
+    Parameters:
+        request (schemas.BatchGetRequest): The IDs of the customers to retrieve.
+        db (Session, optional): The database session dependency. Defaults to Depends(get_db()).
+
+    Returns:
+        schemas.CustomerBatchResponse: The customers found, in request order, and the IDs that were not found.
+    """
+    guardrails.check_customer_expansion(db, request.ids)
+    found = get_by_ids(db, Customer, request.ids, CUSTOMER_RESPONSE_LOADS)
+    shards.load_customer_sales(db, found.values())
+    return batch_response(request.ids, found)
+
+
 @router.get("/customers/{customer_id}", response_model=CustomerResponse)
 def read_customer(customer_id: int, db: Session = Depends(get_db)):
     """
@@ -268,12 +624,87 @@ def read_customer(customer_id: int, db: Session = Depends(get_db)):
     Returns:
         schemas.CustomerResponse: Details of the requested customer.
     """
+    guardrails.check_customer_expansion(db, [customer_id])
     customer = db.query(Customer).filter(Customer.id == customer_id).first()
     if customer is None:
         raise HTTPException(status_code=404, detail="Customer not found")
+    shards.load_customer_sales(db, [customer])
     return customer
 
 
+def parse_sale_cursor(cursor: str):
+    """
+    Parse a purchase history cursor of the form "<sale_date>:<sale_id>".
+
+    Parameters:
+        cursor (str): The cursor returned as next_cursor by the previous page.
+
+    Returns:
+        Tuple[date, int]: The date and ID of the last sale of the previous page.
+    """
+    try:
+        sale_date, sale_id = cursor.split(":")
+        return date.fromisoformat(sale_date), int(sale_id)
+    except ValueError:
+        raise HTTPException(status_code=422, detail="Invalid cursor")
+
+
+@router.get("/customers/{customer_id}/sales", response_model=CustomerSalesResponse)
+def get_customer_sales(
+    customer_id: int,
+    limit: int = Query(20, ge=1, le=guardrails.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    include_totals: bool = False,
+    db: Session = Depends(get_db),
+):
+    """
+    Get a page of a customer's purchase history, newest first.
+
+    Pages are read from the (customer_id, sale_date) index, so each page costs
+    the same however many sales the customer has. Archived years are only read
+    once the page reaches back past the sales table's rows for the customer.
+    Lifetime totals are read from the customer_summaries table, which is
+    maintained on write.
+
+    Parameters:
+        customer_id (int): The ID of the customer.
+        limit (int, optional): Maximum number of sales to return, at most MAX_PAGE_SIZE. Defaults to 20.
+        cursor (str, optional): The next_cursor of the previous page. Defaults to None, the newest sales.
+        since (date, optional): Only include sales on or after this date. Defaults to None.
+        until (date, optional): Only include sales on or before this date. Defaults to None.
+        include_totals (bool, optional): Also return the customer's lifetime totals. Defaults to False.
+        db (Session, optional): The database session dependency. Defaults to Depends(get_db()).
+
+    Returns:
+        schemas.CustomerSalesResponse: The sales of the page, the cursor of the next page and the totals.
+    """
+    if db.get(Customer, customer_id) is None:
+        raise HTTPException(status_code=404, detail="Customer not found")
+
+    query = db.query(Sale).filter(Sale.customer_id == customer_id)
+    if since is not None:
+        query = query.filter(Sale.sale_date >= since)
+    if until is not None:
+        query = query.filter(Sale.sale_date <= until)
+    before = parse_sale_cursor(cursor) if cursor is not None else None
+    if before is not None:
+        query = query.filter(tuple_(Sale.sale_date, Sale.id) < tuple_(*before))
+    sales = query.order_by(Sale.sale_date.desc(), Sale.id.desc()).limit(limit + 1).all()
+    # In sharded mode every shard returns its own newest sales; merge them.
+    sales.sort(key=lambda sale: (sale.sale_date, sale.id), reverse=True)
+    # Archived sales can only make the page if they are at least as new as its last sale.
+    oldest = sales[limit].sale_date if len(sales) > limit else since
+    sales += partitions.get_archived_customer_sales(db, customer_id, limit + 1, oldest, until, before)
+    sales.sort(key=lambda sale: (sale.sale_date, sale.id), reverse=True)
+
+    page = sales[:limit]
+    next_cursor = f"{page[-1].sale_date.isoformat()}:{page[-1].id}" if len(sales) > limit else None
+    totals = summaries.get_customer_totals(db, customer_id) if include_totals else None
+    return {"items": page, "next_cursor": next_cursor, "totals": totals}
+
+
 @router.put("/customers/{customer_id}", response_model=CustomerResponse)
 def update_customer(customer_id: int, customer: CustomerUpdate, db: Session = Depends(get_db)):
     """
@@ -296,6 +727,7 @@ def update_customer(customer_id: int, customer: CustomerUpdate, db: Session = De
 
     db.commit()
     db.refresh(db_customer)
+    shards.load_customer_sales(db, [db_customer])
     return db_customer
 
 
@@ -314,7 +746,9 @@ def delete_customer(customer_id: int, db: Session = Depends(get_db)):
     customer = db.query(Customer).filter(Customer.id == customer_id).first()
     if customer is None:
         raise HTTPException(status_code=404, detail="Customer not found")
+    shards.load_customer_sales(db, [customer])
 
+    summaries.customer_deleted(db, customer.id)
     db.delete(customer)
     db.commit()
     return customer
@@ -334,30 +768,106 @@ def create_sale(sale: SaleCreate, db: Session = Depends(get_db)):
     Returns:
         schemas.SaleResponse: The details of the created sale.
     """
-    db_sale = Sale(**sale.dict())
+    if partitions.is_archived(db, sale.sale_date):
+        raise HTTPException(status_code=409, detail="Sales period is archived and read-only")
+
+    db_sale = Sale(**sale.dict(), id=partitions.next_sale_id(db))
     db.add(db_sale)
+    db.flush()
+    # Looked up on every shard, unlike db_sale.car, which only searches the sale's shard.
+    car = db.get(Car, db_sale.car_id)
+    if car is not None and shards.shard_of(car) != shards.shard_of(db_sale):
+        # A sale lives on its dealer's shard, so its car has to be stored there as well.
+        raise HTTPException(status_code=422, detail="Car is not on the dealer's shard")
+    if car is not None and not summaries.mark_car_sold(db, car, db_sale.sale_date):
+        raise HTTPException(status_code=409, detail="Car is already sold")
+    summaries.sale_added(db, db_sale.dealer_id, db_sale.sale_date, db_sale.sale_amount, car)
+    summaries.customer_sale_added(
+        db, db_sale.customer_id, db_sale.sale_date, db_sale.sale_amount, shards.shard_of(db_sale)
+    )
     db.commit()
     db.refresh(db_sale)
     return db_sale
 
 
-@router.get("/sales/", response_model=List[SaleResponse])
-def get_all_sales(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
+@router.get("/sales/", response_model=List[SaleResponse], responses=formats.BINARY_RESPONSES)
+def get_all_sales(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1, le=guardrails.MAX_PAGE_SIZE),
+    include_archived: bool = False,
+    accept: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+):
     """
     Get a list of all sales.
 
+    Responds with the sales table's columns as Apache Arrow IPC or MessagePack
+    instead of JSON when the Accept header asks for it.
+
     Parameters:
         skip (int, optional): Number of sales to skip. Defaults to 0.
-        limit (int, optional): Maximum number of sales to return. Defaults to 10.
+        limit (int, optional): Maximum number of sales to return, at most MAX_PAGE_SIZE. Defaults to 10.
+        include_archived (bool, optional): Also list sales from archived periods. Defaults to False.
+        accept (str, optional): The Accept header. Defaults to None.
         db (Session, optional): The database session dependency. Defaults to Depends(get_db()).
 
     Returns:
         List[schemas.SaleResponse]: List of sales.
     """
-    sales = db.query(Sale).offset(skip).limit(limit).all()
+    include_archived = include_archived and partitions.archives_enabled()
+    media_type = formats.negotiate(accept)
+    if media_type is not None:
+        if include_archived:
+            keys, rows = partitions.select_sales(db, skip, limit)
+        else:
+            keys, rows = columns_page(db, Sale, skip, limit)
+        return formats.columns_response(keys, rows, media_type)
+    if include_archived:
+        return partitions.list_sales(db, skip, limit)
+    sales = list_page(db, Sale, skip, limit)
     return sales
 
 
+def get_sales_by_ids(db: Session, ids: List[int]):
+    """
+    Fetch many sales by ID, falling back to the archives for IDs not in the sales table.
+    """
+    found = get_by_ids(db, Sale, ids, SALE_RESPONSE_LOADS)
+    found.update(partitions.get_archived_sales(db, [sale_id for sale_id in ids if sale_id not in found]))
+    return found
+
+
+@router.get("/sales/batch", response_model=SaleBatchResponse)
+def get_sales_batch(ids: str, db: Session = Depends(get_db)):
+    """
+    Get many sales by ID, including sales from archived periods.
+
+    Parameters:
+        ids (str): Comma-separated IDs of the sales to retrieve, e.g. "1,2,3".
+        db (Session, optional): The database session dependency. Defaults to Depends(get_db()).
+
+    Returns:
+        schemas.SaleBatchResponse: The sales found, in request order, and the IDs that were not found.
+    """
+    ids = parse_ids(ids)
+    return batch_response(ids, get_sales_by_ids(db, ids))
+
+
+@router.post("/sales/batch-get", response_model=SaleBatchResponse)
+def batch_get_sales(request: BatchGetRequest, db: Session = Depends(get_db)):
+    """
+    Get many sales by ID, with the IDs in the request body, including sales from archived periods.
+
+    Parameters:
+        request (schemas.BatchGetRequest): The IDs of the sales to retrieve.
+        db (Session, optional): The database session dependency. Defaults to Depends(get_db()).
+
+    Returns:
+        schemas.SaleBatchResponse: The sales found, in request order, and the IDs that were not found.
+    """
+    return batch_response(request.ids, get_sales_by_ids(db, request.ids))
+
+
 @router.get("/sales/{sale_id}", response_model=SaleResponse)
 def read_sale(sale_id: int, db: Session = Depends(get_db)):
     """
@@ -371,6 +881,8 @@ def read_sale(sale_id: int, db: Session = Depends(get_db)):
         schemas.SaleResponse: Details of the requested sale.
     """
     sale = db.query(Sale).filter(Sale.id == sale_id).first()
+    if sale is None:
+        sale = partitions.get_archived_sale(db, sale_id)
     if sale is None:
         raise HTTPException(status_code=404, detail="Sale not found")
     return sale
@@ -391,11 +903,25 @@ def update_sale(sale_id: int, sale: SaleUpdate, db: Session = Depends(get_db)):
     """
     db_sale = db.query(Sale).filter(Sale.id == sale_id).first()
     if db_sale is None:
+        if partitions.get_archived_sale(db, sale_id) is not None:
+            raise HTTPException(status_code=409, detail="Sales period is archived and read-only")
         raise HTTPException(status_code=404, detail="Sale not found")
+    if partitions.is_archived(db, sale.sale_date):
+        raise HTTPException(status_code=409, detail="Sales period is archived and read-only")
 
+    summaries.sale_removed(db, db_sale.dealer_id, db_sale.sale_date, db_sale.sale_amount, db_sale.car)
+    old_sale_date, old_sale_amount = db_sale.sale_date, db_sale.sale_amount
     for key, value in sale.dict().items():
         setattr(db_sale, key, value)
 
+    summaries.sale_added(db, db_sale.dealer_id, db_sale.sale_date, db_sale.sale_amount, db_sale.car)
+    db.flush()
+    summaries.customer_sale_removed(
+        db, db_sale.customer_id, old_sale_date, old_sale_amount, shards.shard_of(db_sale)
+    )
+    summaries.customer_sale_added(
+        db, db_sale.customer_id, db_sale.sale_date, db_sale.sale_amount, shards.shard_of(db_sale)
+    )
     db.commit()
     db.refresh(db_sale)
     return db_sale
@@ -415,8 +941,52 @@ def delete_sale(sale_id: int, db: Session = Depends(get_db)):
     """
     sale = db.query(Sale).filter(Sale.id == sale_id).first()
     if sale is None:
+        if partitions.get_archived_sale(db, sale_id) is not None:
+            raise HTTPException(status_code=409, detail="Sales period is archived and read-only")
         raise HTTPException(status_code=404, detail="Sale not found")
 
+    summaries.sale_removed(db, sale.dealer_id, sale.sale_date, sale.sale_amount, sale.car)
     db.delete(sale)
+    db.flush()
+    summaries.customer_sale_removed(db, sale.customer_id, sale.sale_date, sale.sale_amount, shards.shard_of(sale))
     db.commit()
     return sale
+
+# Change feed routes
+
+
+@router.get("/changes", response_model=ChangeFeedResponse)
+async def get_changes(
+    since: int = 0,
+    limit: int = Query(100, ge=1, le=1000),
+    wait: float = Query(0, ge=0, le=30),
+    shard: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Get the inserts, updates and deletes made after a sequence number.
+
+    Consumers pass the `last_seq` of the previous response as `since` to sync
+    incrementally. With `wait`, the request long-polls until a change arrives
+    or the wait expires; waiting consumers only occupy the event loop, not a
+    worker thread. In sharded mode every shard keeps its own change log, so
+    consumers follow each shard separately.
+
+    Parameters:
+        since (int, optional): The last sequence number already seen. Defaults to 0.
+        limit (int, optional): Maximum number of changes to return. Defaults to 100.
+        wait (float, optional): Seconds to wait for a change if there is none yet. Defaults to 0.
+        shard (str, optional): The shard to read in sharded mode. Defaults to the primary shard.
+        db (Session, optional): The database session dependency. Defaults to Depends(get_db()).
+
+    Returns:
+        schemas.ChangeFeedResponse: The changes and the sequence number to continue from.
+    """
+    if shards.SHARDING_ENABLED:
+        shard = shard or shards.PRIMARY_SHARD
+        if shard not in shards.SHARD_IDS:
+            raise HTTPException(status_code=422, detail="Unknown shard")
+    else:
+        shard = None
+    feed = await changes.wait_for_changes(db, since, limit, wait, shard)
+    return {"changes": feed, "last_seq": feed[-1]["seq"] if feed else since}
@@ -1,6 +1,6 @@
 # schemas.py
-from datetime import date
-from pydantic import BaseModel
+from datetime import date, datetime
+from pydantic import BaseModel, Field
 from typing import List, Optional
 
 
@@ -68,6 +68,28 @@ class DealerListResponse(BaseModel):
     contact_info: Optional[str]
 
 
+class DealerSummaryResponse(BaseModel):
+    """
+    Response schema for a dealer's inventory and sales summary.
+
+    Attributes:
+        dealer_id (int): The unique identifier for the dealer.
+        in_stock_count (int): Number of the dealer's cars that have not been sold.
+        sold_count (int): Number of the dealer's cars that have been sold.
+        inventory_value (float): Total price of the dealer's cars that have not been sold.
+        sales_this_month (int): Number of sales made by the dealer in the current month.
+        sales_this_month_amount (float): Total amount of the sales made by the dealer in the current month.
+        average_days_to_sell (Optional[float]): Average number of days between listing and sale.
+    """
+    dealer_id: int
+    in_stock_count: int
+    sold_count: int
+    inventory_value: float
+    sales_this_month: int
+    sales_this_month_amount: float
+    average_days_to_sell: Optional[float]
+
+
 class CarBase(BaseModel):
     """
     Base schema for a car.
@@ -219,6 +241,24 @@ class CustomerListResponse(BaseModel):
     address: Optional[str]
 
 
+class CustomerSummaryResponse(BaseModel):
+    """
+    Response schema for a customer's lifetime purchase totals.
+
+    Attributes:
+        customer_id (int): The unique identifier for the customer.
+        sale_count (int): Number of sales made to the customer.
+        total_spent (float): Total amount of the sales made to the customer.
+        first_purchase_date (Optional[date]): Date of the customer's earliest sale.
+        last_purchase_date (Optional[date]): Date of the customer's latest sale.
+    """
+    customer_id: int
+    sale_count: int
+    total_spent: float
+    first_purchase_date: Optional[date]
+    last_purchase_date: Optional[date]
+
+
 class SaleBase(BaseModel):
     """
     Base schema for a sale.
@@ -290,3 +330,111 @@ class SaleListResponse(BaseModel):
     sale_date: date
     sale_amount: float
     payment_method: str
+
+
+class CustomerSalesResponse(BaseModel):
+    """
+    Response schema for a page of a customer's purchase history.
+
+    Attributes:
+        items (List[SaleListResponse]): The customer's sales, newest first.
+        next_cursor (Optional[str]): The cursor to pass to read the next page, None on the last page.
+        totals (Optional[CustomerSummaryResponse]): The customer's lifetime totals, when requested.
+    """
+    items: List[SaleListResponse]
+    next_cursor: Optional[str] = None
+    totals: Optional[CustomerSummaryResponse] = None
+
+
+# Maximum number of IDs accepted by a single batch read.
+MAX_BATCH_IDS = 5000
+
+
+class BatchGetRequest(BaseModel):
+    """
+    Request schema for fetching many resources by ID.
+
+    Attributes:
+        ids (List[int]): The IDs to fetch, in the order the results should be returned.
+    """
+    ids: List[int] = Field(max_length=MAX_BATCH_IDS)
+
+
+class DealerBatchResponse(BaseModel):
+    """
+    Response schema for a batch read of dealers.
+
+    Attributes:
+        items (List[DealerResponse]): The dealers found, in request order.
+        missing (List[int]): The requested IDs that do not exist.
+    """
+    items: List[DealerResponse]
+    missing: List[int] = []
+
+
+class CarBatchResponse(BaseModel):
+    """
+    Response schema for a batch read of cars.
+
+    Attributes:
+        items (List[CarResponse]): The cars found, in request order.
+        missing (List[int]): The requested IDs that do not exist.
+    """
+    items: List[CarResponse]
+    missing: List[int] = []
+
+
+class CustomerBatchResponse(BaseModel):
+    """
+    Response schema for a batch read of customers.
+
+    Attributes:
+        items (List[CustomerResponse]): The customers found, in request order.
+        missing (List[int]): The requested IDs that do not exist.
+    """
+    items: List[CustomerResponse]
+    missing: List[int] = []
+
+
+class SaleBatchResponse(BaseModel):
+    """
+    Response schema for a batch read of sales.
+
+    Attributes:
+        items (List[SaleResponse]): The sales found, in request order.
+        missing (List[int]): The requested IDs that do not exist.
+    """
+    items: List[SaleResponse]
+    missing: List[int] = []
+
+
+class ChangeResponse(BaseModel):
+    """
+    Response schema for a change log entry.
+
+    Attributes:
+        seq (int): The sequence number of the change.
+        entity (str): The table of the changed row: "dealers", "cars", "customers" or "sales".
+        entity_id (int): The ID of the changed row.
+        op (str): The kind of change: "insert", "update" or "delete".
+        changed_columns (List[str]): The columns that were set or changed.
+        changed_at (datetime): When the change was made (UTC).
+    """
+    seq: int
+    entity: str
+    entity_id: int
+    op: str
+    changed_columns: List[str] = []
+    changed_at: datetime
+
+
+class ChangeFeedResponse(BaseModel):
+    """
+    Response schema for a page of the change feed.
+
+    Attributes:
+        changes (List[ChangeResponse]): The changes after the requested sequence number, oldest first.
+        last_seq (int): The sequence number to pass as `since` to read the next page.
+    """
+    changes: List[ChangeResponse]
+    last_seq: int
@@ -1,11 +1,18 @@
+import guardrails
+import shards
 from db import SessionLocal
 
+# In sharded mode sessions route each dealer's rows to the shard that holds them.
+if shards.SHARDING_ENABLED:
+    SessionLocal = shards.SessionLocal
+
 
 def get_db():
     """
     Generator function to obtain a database session using SessionLocal.
     """
     db = SessionLocal()
+    db.info["statement_timeout"] = guardrails.STATEMENT_TIMEOUT
     try:
         yield db
     finally:
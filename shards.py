@@ -0,0 +1,797 @@
+# shards.py
+"""
+Dealer-sharded multi-database mode.
+
+Set SHARD_URLS to a comma-separated list of database URLs to spread dealers
+over several databases. Each dealer, with its cars, sales and summary, lives
+on one shard; the dealer_shards table in the main database (DATABASE_URL)
+maps dealer IDs to shards and hands out dealer IDs. Customers are replicated
+to every shard so that sales can reference them locally. Car and sale IDs are
+allocated per shard as `sequence * MAX_SHARDS + shard index`, so they stay
+unique across shards without a shared counter. The unique index on cars.vin
+only covers one shard, so the car_vins table in the main database records
+which car holds each VIN; a car's VIN is claimed there before the car is
+written to its shard.
+
+Sessions route through SQLAlchemy's horizontal sharding extension: queries
+filtered by dealer go to the owning shard, other queries run on every shard.
+Use `python shards.py status|move|rebalance` to inspect and move dealers.
+"""
+import argparse
+import heapq
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from sqlalchemy import (
+    Boolean, Column, Float, Integer, MetaData, String, Table, bindparam, create_engine, delete, event, func,
+    insert, inspect, select, update,
+)
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.horizontal_shard import ShardedSession, set_shard_id
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.sql import operators, visitors
+from sqlalchemy.sql.elements import BindParameter
+from sqlalchemy.sql.schema import Column as SchemaColumn
+from db import engine as directory_engine
+from models import Car, Customer, Dealer, DealerSummary, Sale, SalePartition
+import changes
+import summaries
+
+# Comma-separated URLs of the shard databases. Sharding is off when unset.
+SHARD_URLS = [url.strip() for url in os.getenv("SHARD_URLS", "").split(",") if url.strip()]
+SHARDING_ENABLED = bool(SHARD_URLS)
+
+# Upper bound on the number of shards; car and sale IDs are interleaved by it.
+MAX_SHARDS = 64
+
+# The shard holding the authoritative copy of replicated and unsharded tables.
+PRIMARY_SHARD = "0"
+
+SHARD_IDS = [str(index) for index in range(len(SHARD_URLS))]
+if len(SHARD_IDS) > MAX_SHARDS:
+    raise ValueError(f"At most {MAX_SHARDS} shards are supported")
+
+engines = {
+    shard_id: create_engine(url, connect_args={"timeout": 30}) for shard_id, url in zip(SHARD_IDS, SHARD_URLS)
+}
+
+# Tables that live in the main database.
+directory_metadata = MetaData()
+dealer_shards = Table(
+    "dealer_shards", directory_metadata,
+    Column("dealer_id", Integer, primary_key=True),
+    Column("shard_id", String, nullable=False, index=True),
+    Column("moving", Boolean, nullable=False, default=False),
+    sqlite_autoincrement=True,
+)
+car_vins = Table(
+    "car_vins", directory_metadata,
+    Column("vin", String, primary_key=True),
+    Column("car_id", Integer, nullable=False),
+    Column("claimed_at", Float, nullable=False),
+)
+
+# Seconds after which a claim without a stored car, left behind by a crashed process, is dropped at startup.
+VIN_CLAIM_TIMEOUT = 60
+
+# Tables that live on every shard next to the application tables.
+shard_metadata = MetaData()
+shard_sequences = Table(
+    "shard_sequences", shard_metadata,
+    Column("name", String, primary_key=True),
+    Column("next_value", Integer, nullable=False),
+)
+
+# Models that live on the shard of their dealer.
+DEALER_SCOPED = (Dealer, DealerSummary, Car, Sale)
+# Models kept on the primary shard only, or replicated from it.
+PRIMARY_ONLY = (Customer, SalePartition)
+
+
+class DealerMovingError(Exception):
+    """
+    Raised when writing to a dealer that is being moved to another shard.
+    """
+
+
+class DuplicateVinError(Exception):
+    """
+    Raised when flushing a car whose VIN another car, on any shard, already holds.
+    """
+
+
+_executor = None
+
+
+def _fan_out_executor():
+    """
+    Return the thread pool used to query all shards in parallel.
+    """
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=max(len(engines), 1), thread_name_prefix="shard")
+    return _executor
+
+
+def fan_out(fn, shard_ids=None):
+    """
+    Run fn(shard_id, engine) on every shard in parallel.
+
+    Parameters:
+        fn (Callable): The function to run for each shard.
+        shard_ids (List[str], optional): The shards to run on. Defaults to all shards.
+
+    Returns:
+        Dict[str, Any]: The result of fn for each shard ID.
+    """
+    executor = _fan_out_executor()
+    futures = {shard_id: executor.submit(fn, shard_id, engines[shard_id]) for shard_id in shard_ids or SHARD_IDS}
+    return {shard_id: future.result() for shard_id, future in futures.items()}
+
+
+# Dealer directory
+
+
+def _directory_cache(session):
+    """
+    Return the (shard ID, moving) directory rows read by a session's current transaction, keyed by dealer ID.
+    """
+    if session is None:
+        return {}
+    return session.info.setdefault("dealer_shards", {})
+
+
+def lookup_dealer(dealer_id, for_write=False, session=None):
+    """
+    Return the shard a dealer lives on.
+
+    With a session, each dealer is read from the directory once per transaction
+    of the session, and every write in the transaction checks the moving flag
+    read then. Transactions that began before a move flagged the dealer finish
+    within the move's grace period.
+
+    Parameters:
+        dealer_id (int): The ID of the dealer.
+        for_write (bool, optional): Reject dealers that are being moved. Defaults to False.
+        session (Session, optional): The session whose transaction the lookup is part of. Defaults to None.
+
+    Returns:
+        Optional[str]: The shard ID, or None for an unknown dealer.
+    """
+    if dealer_id is None:
+        return None
+    cache = _directory_cache(session)
+    if dealer_id not in cache:
+        with directory_engine.connect() as conn:
+            row = conn.execute(
+                select(dealer_shards.c.shard_id, dealer_shards.c.moving).where(dealer_shards.c.dealer_id == dealer_id)
+            ).first()
+        cache[dealer_id] = tuple(row) if row is not None else None
+    if cache[dealer_id] is None:
+        return None
+    shard_id, moving = cache[dealer_id]
+    if for_write and moving:
+        raise DealerMovingError(f"Dealer {dealer_id} is being moved to another shard")
+    return shard_id
+
+
+def register_dealer():
+    """
+    Allocate a dealer ID and assign it to the shard with the fewest dealers.
+
+    Returns:
+        Tuple[int, str]: The new dealer ID and its shard ID.
+    """
+    with directory_engine.begin() as conn:
+        counts = dict(conn.execute(
+            select(dealer_shards.c.shard_id, func.count()).group_by(dealer_shards.c.shard_id)
+        ).all())
+        shard_id = min(SHARD_IDS, key=lambda candidate: (counts.get(candidate, 0), int(candidate)))
+        dealer_id = conn.execute(insert(dealer_shards).values(shard_id=shard_id, moving=False)).inserted_primary_key[0]
+    return dealer_id, shard_id
+
+
+def unregister_dealers(dealer_ids):
+    """
+    Remove deleted dealers from the directory.
+    """
+    with directory_engine.begin() as conn:
+        conn.execute(delete(dealer_shards).where(dealer_shards.c.dealer_id.in_(dealer_ids)))
+
+
+def claim_vin(vin, car_id):
+    """
+    Record a car as the holder of a VIN, so that no car on another shard can take it.
+
+    Parameters:
+        vin (str): The VIN to claim.
+        car_id (int): The ID of the car.
+
+    Returns:
+        bool: True if the claim is new, False if the car already held the VIN.
+
+    Raises:
+        DuplicateVinError: Another car holds the VIN.
+    """
+    with directory_engine.begin() as conn:
+        claimed = conn.execute(
+            sqlite_insert(car_vins).values(vin=vin, car_id=car_id, claimed_at=time.time()).on_conflict_do_nothing()
+        ).rowcount
+        holder = conn.execute(select(car_vins.c.car_id).where(car_vins.c.vin == vin)).scalar_one()
+    if holder != car_id:
+        raise DuplicateVinError(f"VIN {vin} is held by car {holder}")
+    return claimed == 1
+
+
+def release_vins(claims):
+    """
+    Drop VIN claims of cars that were deleted, changed their VIN or were never stored.
+
+    Parameters:
+        claims (Iterable[Tuple[str, int]]): The (VIN, car ID) pairs to release.
+    """
+    claims = [{"released_vin": vin, "released_car_id": car_id} for vin, car_id in claims]
+    if not claims:
+        return
+    with directory_engine.begin() as conn:
+        conn.execute(
+            delete(car_vins).where(
+                car_vins.c.vin == bindparam("released_vin"), car_vins.c.car_id == bindparam("released_car_id")
+            ),
+            claims,
+        )
+
+
+def _dealer_id_of(instance):
+    """
+    Return the dealer a dealer-scoped instance belongs to.
+    """
+    return instance.id if isinstance(instance, Dealer) else instance.dealer_id
+
+
+def _shard_for_instance(session, instance, for_write=False):
+    """
+    Return the shard a new or changed instance should be written to.
+    """
+    if isinstance(instance, DEALER_SCOPED):
+        return lookup_dealer(_dealer_id_of(instance), for_write, session) or PRIMARY_SHARD
+    return PRIMARY_SHARD
+
+
+def shard_of(instance):
+    """
+    Return the shard a loaded or flushed instance lives on, or None when sharding is off.
+    """
+    return inspect(instance).identity_token
+
+
+# Routing callbacks for ShardedSession
+
+
+def shard_chooser(session, mapper, instance, clause=None):
+    """
+    Choose the shard for an instance being flushed.
+    """
+    if instance is None:
+        return PRIMARY_SHARD
+    return _shard_for_instance(session, instance, for_write=True)
+
+
+def identity_chooser(session, mapper, primary_key, *, lazy_loaded_from, **kw):
+    """
+    Return the shards a primary key lookup should search.
+    """
+    if lazy_loaded_from is not None:
+        return [lazy_loaded_from.identity_token]
+    model = mapper.class_
+    if model in (Dealer, DealerSummary):
+        shard_id = lookup_dealer(primary_key[0], session=session)
+        return [shard_id] if shard_id is not None else []
+    if model in PRIMARY_ONLY:
+        return [PRIMARY_SHARD]
+    return SHARD_IDS
+
+
+def _criteria_dealer_ids(statement, parameters):
+    """
+    Collect the dealer IDs a statement's WHERE clause restricts it to, or None if it is not restricted.
+
+    Only `dealer_id = x`, `dealer_id IN (...)` and `dealers.id = x` comparisons
+    are recognized; the clause is assumed to combine them with AND. Values bound
+    at execution time, as Session.get and eager loaders do, are read from parameters.
+    """
+    whereclause = getattr(statement, "whereclause", None)
+    if whereclause is None:
+        return None
+    dealer_ids = set()
+
+    def visit_binary(binary):
+        column, value = binary.left, binary.right
+        if not isinstance(column, SchemaColumn) or not isinstance(value, BindParameter):
+            return
+        if column.name != "dealer_id" and not (column.table.name == "dealers" and column.name == "id"):
+            return
+        bound = parameters.get(value.key, value.effective_value) if isinstance(parameters, dict) else value.effective_value
+        if bound is None:
+            return
+        if binary.operator == operators.eq:
+            dealer_ids.add(bound)
+        elif binary.operator == operators.in_op:
+            dealer_ids.update(bound)
+
+    visitors.traverse(whereclause, {}, {"binary": visit_binary})
+    return dealer_ids or None
+
+
+def execute_chooser(orm_context):
+    """
+    Return the shards a query, update or delete should run on.
+    """
+    mapper = orm_context.bind_mapper
+    model = mapper.class_ if mapper is not None else None
+    if model in PRIMARY_ONLY:
+        return [PRIMARY_SHARD]
+    if model in DEALER_SCOPED:
+        lazy_loaded_from = orm_context.lazy_loaded_from if orm_context.is_select else None
+        if lazy_loaded_from is not None and issubclass(lazy_loaded_from.class_, DEALER_SCOPED):
+            # Relationships between a dealer's rows never leave the dealer's shard.
+            return [lazy_loaded_from.identity_token]
+        dealer_ids = _criteria_dealer_ids(orm_context.statement, orm_context.parameters)
+        if dealer_ids is not None:
+            for_write = not orm_context.is_select
+            session = orm_context.session
+            return sorted({
+                lookup_dealer(dealer_id, for_write, session) or PRIMARY_SHARD for dealer_id in dealer_ids
+            })
+    return SHARD_IDS
+
+
+class DealerShardedSession(ShardedSession):
+    """
+    A session that routes dealers and their cars, sales and summaries to their shard.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(
+            shard_chooser=partial(shard_chooser, self),
+            identity_chooser=partial(identity_chooser, self),
+            execute_chooser=execute_chooser,
+            shards=engines,
+            **kwargs,
+        )
+
+
+# Create a session class for sharded mode, used instead of db.SessionLocal.
+SessionLocal = sessionmaker(class_=DealerShardedSession, autocommit=False, autoflush=False)
+
+
+def _allocate_id(session, shard_id, name):
+    """
+    Allocate a cluster-wide unique ID for a new row of a shard's table.
+    """
+    conn = session.connection(bind_arguments={"shard_id": shard_id})
+    value = conn.execute(
+        sqlite_insert(shard_sequences)
+        .values(name=name, next_value=2)
+        .on_conflict_do_update(
+            index_elements=[shard_sequences.c.name], set_={"next_value": shard_sequences.c.next_value + 1}
+        )
+        .returning(shard_sequences.c.next_value - 1)
+    ).scalar_one()
+    return value * MAX_SHARDS + int(shard_id)
+
+
+@event.listens_for(DealerShardedSession, "before_flush")
+def _assign_shards(session, flush_context, instances):
+    """
+    Place new rows on their shard and give them IDs that are unique across shards.
+    """
+    for obj in list(session.new):
+        state = inspect(obj)
+        if isinstance(obj, Dealer) and obj.id is None:
+            obj.id, state.identity_token = register_dealer()
+            _directory_cache(session)[obj.id] = (state.identity_token, False)
+        elif state.identity_token is None:
+            state.identity_token = _shard_for_instance(session, obj, for_write=True)
+        if isinstance(obj, (Car, Sale)) and obj.id is None:
+            obj.id = _allocate_id(session, state.identity_token, obj.__tablename__)
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, DEALER_SCOPED):
+            lookup_dealer(_dealer_id_of(obj), True, session)
+    _claim_car_vins(session)
+
+
+def _claim_car_vins(session):
+    """
+    Claim the VINs of new cars and changed VINs before they are flushed, and note the VINs to release on commit.
+    """
+    claimed = session.info.setdefault("claimed_vins", [])
+    released = session.info.setdefault("released_vins", [])
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, Car):
+            continue
+        history = inspect(obj).attrs.vin.history
+        if obj in session.dirty and not history.has_changes():
+            continue
+        if obj.vin is not None and claim_vin(obj.vin, obj.id):
+            claimed.append((obj.vin, obj.id))
+        released.extend((vin, obj.id) for vin in history.deleted if vin is not None)
+    for obj in session.deleted:
+        if isinstance(obj, Car) and obj.vin is not None:
+            released.append((obj.vin, obj.id))
+
+
+@event.listens_for(DealerShardedSession, "after_transaction_end")
+def _forget_dealer_shards(session, transaction):
+    """
+    Read the directory afresh in the session's next transaction, so its writes see dealers flagged as moving since.
+    """
+    if transaction.parent is None:
+        session.info.pop("dealer_shards", None)
+
+
+@event.listens_for(DealerShardedSession, "after_flush")
+def _replicate_customers(session, flush_context):
+    """
+    Copy customer inserts, updates and deletes from the primary shard to every other shard.
+    """
+    table = Customer.__table__
+    upserts = [
+        {column.key: getattr(obj, column.key) for column in table.columns}
+        for obj in list(session.new) + list(session.dirty) if isinstance(obj, Customer)
+    ]
+    deletes = [obj.id for obj in session.deleted if isinstance(obj, Customer)]
+    if not upserts and not deletes:
+        return
+    for shard_id in SHARD_IDS:
+        if shard_id == PRIMARY_SHARD:
+            continue
+        conn = session.connection(bind_arguments={"shard_id": shard_id})
+        if upserts:
+            conn.execute(insert(table).prefix_with("OR REPLACE"), upserts)
+        if deletes:
+            conn.execute(delete(table).where(table.c.id.in_(deletes)))
+
+
+@event.listens_for(DealerShardedSession, "after_flush")
+def _collect_deleted_dealers(session, flush_context):
+    """
+    Remember dealers deleted by the flush so they can be dropped from the directory on commit.
+    """
+    for obj in session.deleted:
+        if isinstance(obj, Dealer):
+            session.info.setdefault("deleted_dealers", set()).add(obj.id)
+
+
+@event.listens_for(DealerShardedSession, "after_commit")
+def _unregister_deleted_dealers(session):
+    """
+    Drop deleted dealers from the directory once their deletion is committed.
+    """
+    dealer_ids = session.info.pop("deleted_dealers", None)
+    if dealer_ids:
+        unregister_dealers(dealer_ids)
+
+
+@event.listens_for(DealerShardedSession, "after_rollback")
+def _forget_deleted_dealers(session):
+    """
+    Keep dealers whose deletion was rolled back in the directory.
+    """
+    session.info.pop("deleted_dealers", None)
+
+
+@event.listens_for(DealerShardedSession, "after_commit")
+def _release_replaced_vins(session):
+    """
+    Release the VINs of cars deleted or given another VIN once the change is committed.
+    """
+    session.info.pop("claimed_vins", None)
+    release_vins(session.info.pop("released_vins", []))
+
+
+@event.listens_for(DealerShardedSession, "after_rollback")
+def _release_claimed_vins(session):
+    """
+    Release the VINs claimed for cars whose insert or VIN change was rolled back.
+    """
+    session.info.pop("released_vins", None)
+    release_vins(session.info.pop("claimed_vins", []))
+
+
+# Cross-shard reads
+
+
+def _home_shards(model):
+    """
+    Return the shards holding the authoritative rows of a model.
+    """
+    return [PRIMARY_SHARD] if model in PRIMARY_ONLY else SHARD_IDS
+
+
+def _page_ids(model, skip, limit):
+    """
+    Return the (id, shard) pairs of a page of rows across all shards, ordered by ID.
+    """
+    table = model.__table__
+
+    def shard_ids(shard_id, shard_engine):
+        with shard_engine.connect() as conn:
+            ids = conn.execute(select(table.c.id).order_by(table.c.id).limit(skip + limit)).scalars().all()
+        return [(item_id, shard_id) for item_id in ids]
+
+    merged = heapq.merge(*fan_out(shard_ids, _home_shards(model)).values())
+    return list(merged)[skip:skip + limit]
+
+
+def paginate(db, model, skip, limit, loads=()):
+    """
+    Load a page of a model across all shards, ordered by ID.
+
+    The IDs of the page are found by querying every shard in parallel; the rows
+    are then loaded through the session, one IN query per shard.
+
+    Parameters:
+        db (Session): The sharded database session.
+        model: The model class to list.
+        skip (int): Number of rows to skip.
+        limit (int): Maximum number of rows to return.
+        loads (tuple, optional): Loader options to apply. Defaults to ().
+
+    Returns:
+        list: The rows of the page.
+    """
+    page = _page_ids(model, skip, limit)
+    by_shard = {}
+    for item_id, shard_id in page:
+        by_shard.setdefault(shard_id, []).append(item_id)
+    loaded = {}
+    for shard_id, ids in by_shard.items():
+        query = db.query(model).options(set_shard_id(shard_id), *loads).filter(model.id.in_(ids))
+        loaded.update((row.id, row) for row in query)
+    return [loaded[item_id] for item_id, _ in page if item_id in loaded]
+
+
+def select_columns_page(model, skip, limit):
+    """
+    Select a page of raw rows of a model's table across all shards in parallel, ordered by ID.
+
+    Parameters:
+        model: The model class to list.
+        skip (int): Number of rows to skip.
+        limit (int): Maximum number of rows to return.
+
+    Returns:
+        Tuple[List[str], list]: The column names and the rows.
+    """
+    table = model.__table__
+
+    def shard_rows(shard_id, shard_engine):
+        with shard_engine.connect() as conn:
+            return conn.execute(select(*table.columns).order_by(table.c.id).limit(skip + limit)).all()
+
+    merged = heapq.merge(*fan_out(shard_rows, _home_shards(model)).values(), key=lambda row: row.id)
+    return [column.key for column in table.columns], list(merged)[skip:skip + limit]
+
+
+def load_customer_sales(db, customers):
+    """
+    Replace the sales of customers loaded from the primary shard with their sales from every shard.
+
+    Does nothing when sharding is off.
+
+    Parameters:
+        db (Session): The database session.
+        customers (Iterable[Customer]): The customers to complete.
+    """
+    customers = [customer for customer in customers if customer is not None]
+    if not SHARDING_ENABLED or not customers:
+        return
+    sales = {customer.id: [] for customer in customers}
+    for sale in db.query(Sale).filter(Sale.customer_id.in_(list(sales))).order_by(Sale.id):
+        sales[sale.customer_id].append(sale)
+    for customer in customers:
+        set_committed_value(customer, "sales", sales[customer.id])
+
+
+# Schema and maintenance
+
+
+def prepare(upgrade_schema):
+    """
+    Create the directory table and bring every shard's schema up to date.
+
+    Parameters:
+        upgrade_schema (Callable): migrations.upgrade or migrations.ensure_schema, applied to each shard.
+    """
+    directory_metadata.create_all(bind=directory_engine)
+    for shard_engine in engines.values():
+        upgrade_schema(shard_engine)
+        shard_metadata.create_all(bind=shard_engine)
+    _reconcile_vin_claims()
+
+
+def _reconcile_vin_claims():
+    """
+    Claim the VINs of stored cars that hold none yet, and drop stale claims of cars that were never stored.
+    """
+    def stored_vins(shard_id, shard_engine):
+        with shard_engine.connect() as conn:
+            return conn.execute(select(Car.vin, Car.id).where(Car.vin.is_not(None))).all()
+
+    stored = {(vin, car_id) for rows in fan_out(stored_vins).values() for vin, car_id in rows}
+    now = time.time()
+    with directory_engine.begin() as conn:
+        if stored:
+            conn.execute(
+                sqlite_insert(car_vins).on_conflict_do_nothing(),
+                [{"vin": vin, "car_id": car_id, "claimed_at": now} for vin, car_id in stored],
+            )
+        stale = conn.execute(
+            select(car_vins.c.vin, car_vins.c.car_id).where(car_vins.c.claimed_at < now - VIN_CLAIM_TIMEOUT)
+        ).all()
+    release_vins(claim for claim in stale if tuple(claim) not in stored)
+
+
+def shard_loads():
+    """
+    Count the cars and sales of every dealer on every shard.
+
+    Returns:
+        Dict[str, Dict[int, int]]: Rows per dealer ID, per shard ID.
+    """
+    def dealer_rows(shard_id, shard_engine):
+        loads = {}
+        with shard_engine.connect() as conn:
+            for dealer_id in conn.execute(select(Dealer.__table__.c.id)).scalars():
+                loads[dealer_id] = 0
+            for table in (Car.__table__, Sale.__table__):
+                counts = conn.execute(
+                    select(table.c.dealer_id, func.count()).where(table.c.dealer_id.is_not(None))
+                    .group_by(table.c.dealer_id)
+                )
+                for dealer_id, count in counts:
+                    loads[dealer_id] = loads.get(dealer_id, 0) + count
+        return loads
+
+    return fan_out(dealer_rows)
+
+
+def move_dealer(dealer_id, target, grace_period=1.0):
+    """
+    Move a dealer with its summary, cars and sales to another shard.
+
+    The dealer is flagged as moving first, so new writes to it are rejected
+    with DealerMovingError; after a grace period for in-flight transactions
+    the rows are copied, deleted from the source and the directory switched.
+    The copies are logged as inserts in the target's change log and the
+    deletions as deletes in the source's, in the same transactions. Each
+    shard keeps the customer totals of the sales stored on it, so the totals
+    of the dealer's customers are recomputed on both shards.
+
+    Parameters:
+        dealer_id (int): The ID of the dealer to move.
+        target (str): The ID of the shard to move the dealer to.
+        grace_period (float, optional): Seconds to wait for in-flight writes. Defaults to 1.0.
+    """
+    source = lookup_dealer(dealer_id)
+    if source is None:
+        raise ValueError(f"Dealer {dealer_id} is not in the shard directory")
+    if target not in engines:
+        raise ValueError(f"Unknown shard {target}")
+    if source == target:
+        return
+
+    with directory_engine.begin() as conn:
+        conn.execute(update(dealer_shards).where(dealer_shards.c.dealer_id == dealer_id).values(moving=True))
+    try:
+        time.sleep(grace_period)
+        tables = [
+            (Dealer.__table__, Dealer.__table__.c.id),
+            (DealerSummary.__table__, DealerSummary.__table__.c.dealer_id),
+            (Car.__table__, Car.__table__.c.dealer_id),
+            (Sale.__table__, Sale.__table__.c.dealer_id),
+        ]
+        tracked = {model.__tablename__ for model in changes.TRACKED_MODELS}
+        with engines[source].begin() as src, engines[target].begin() as dst:
+            moved = {}
+            for table, column in tables:
+                rows = src.execute(select(table).where(column == dealer_id)).mappings().all()
+                if rows:
+                    dst.execute(insert(table), [dict(row) for row in rows])
+                moved[table] = rows
+            for table, column in reversed(tables):
+                src.execute(delete(table).where(column == dealer_id))
+            for table, _ in tables:
+                if table.name in tracked:
+                    changes.record_rows(dst, "insert", table, moved[table])
+            for table, _ in reversed(tables):
+                if table.name in tracked:
+                    changes.record_rows(src, "delete", table, moved[table])
+            customer_ids = {row["customer_id"] for row in moved[Sale.__table__] if row["customer_id"] is not None}
+            if customer_ids:
+                summaries.rebuild_customer_summaries(src, customer_ids)
+                summaries.rebuild_customer_summaries(dst, customer_ids)
+        with directory_engine.begin() as conn:
+            conn.execute(
+                update(dealer_shards).where(dealer_shards.c.dealer_id == dealer_id).values(shard_id=target, moving=False)
+            )
+    except Exception:
+        with directory_engine.begin() as conn:
+            conn.execute(update(dealer_shards).where(dealer_shards.c.dealer_id == dealer_id).values(moving=False))
+        raise
+
+
+def plan_rebalance(loads, tolerance=0.1):
+    """
+    Plan dealer moves that even out the number of cars and sales per shard.
+
+    Greedily moves the largest dealer that fits from the most to the least
+    loaded shard until the spread is within tolerance of the average load.
+
+    Parameters:
+        loads (Dict[str, Dict[int, int]]): Rows per dealer ID, per shard ID, from shard_loads().
+        tolerance (float, optional): Allowed spread as a fraction of the average shard load. Defaults to 0.1.
+
+    Returns:
+        List[Tuple[int, str, str]]: The moves, as (dealer ID, source shard, target shard).
+    """
+    loads = {shard_id: dict(dealers) for shard_id, dealers in loads.items()}
+    totals = {shard_id: sum(dealers.values()) for shard_id, dealers in loads.items()}
+    allowed = tolerance * sum(totals.values()) / max(len(totals), 1)
+    moves = []
+    while True:
+        heaviest = max(totals, key=totals.get)
+        lightest = min(totals, key=totals.get)
+        gap = totals[heaviest] - totals[lightest]
+        if gap <= allowed:
+            return moves
+        candidates = [(rows, dealer_id) for dealer_id, rows in loads[heaviest].items() if 0 < rows < gap]
+        if not candidates:
+            return moves
+        rows, dealer_id = max(candidates)
+        del loads[heaviest][dealer_id]
+        loads[lightest][dealer_id] = rows
+        totals[heaviest] -= rows
+        totals[lightest] += rows
+        moves.append((dealer_id, heaviest, lightest))
+
+
+def main():
+    """
+    Command line entry point for inspecting and rebalancing shards.
+    """
+    from migrations import ensure_schema
+
+    parser = argparse.ArgumentParser(description="Inspect and rebalance dealer shards.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("status", help="Show dealers and rows per shard.")
+    move = commands.add_parser("move", help="Move a dealer to another shard.")
+    move.add_argument("dealer_id", type=int)
+    move.add_argument("shard_id")
+    rebalance = commands.add_parser("rebalance", help="Move dealers until shards hold similar numbers of rows.")
+    rebalance.add_argument("--tolerance", type=float, default=0.1)
+    rebalance.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    if not SHARDING_ENABLED:
+        parser.error("SHARD_URLS is not set")
+    prepare(ensure_schema)
+
+    if args.command == "status":
+        for shard_id, dealers in sorted(shard_loads().items()):
+            print(f"shard {shard_id}\t{len(dealers)} dealers\t{sum(dealers.values())} cars and sales")
+    elif args.command == "move":
+        move_dealer(args.dealer_id, args.shard_id)
+        print(f"Moved dealer {args.dealer_id} to shard {args.shard_id}")
+    else:
+        for dealer_id, source, target in plan_rebalance(shard_loads(), args.tolerance):
+            print(f"dealer {dealer_id}: shard {source} -> shard {target}")
+            if not args.dry_run:
+                move_dealer(dealer_id, target)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,411 @@
+# summaries.py
+from datetime import date
+from sqlalchemy import bindparam, case, delete, func, or_, select, text, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from models import Car, CustomerSummary, DealerSummary, Sale
+
+
+def _month_start(day):
+    """
+    Return the first day of the month containing the given date.
+    """
+    return day.replace(day=1)
+
+
+def _days_to_sell(car, sale_date):
+    """
+    Return the number of days a car was listed before it was sold, or None if unknown.
+    """
+    if car.listed_date is None or sale_date is None:
+        return None
+    return max((sale_date - car.listed_date).days, 0)
+
+
+def _increment(db, dealer_id, **deltas):
+    """
+    Atomically add the given deltas to a dealer's counters.
+
+    The update is expressed in SQL (col = col + delta) so concurrent writers
+    never overwrite each other's changes.
+    """
+    if dealer_id is None:
+        return
+    values = {
+        getattr(DealerSummary, name): getattr(DealerSummary, name) + delta
+        for name, delta in deltas.items() if delta
+    }
+    if values:
+        db.execute(update(DealerSummary).where(DealerSummary.dealer_id == dealer_id).values(values))
+
+
+def _add_month_sale(db, dealer_id, sale_date, amount):
+    """
+    Count a sale in the dealer's monthly counters, rolling them over to a newer month if needed.
+    """
+    if dealer_id is None or sale_date is None:
+        return
+    month = _month_start(sale_date)
+    current = DealerSummary.month_start
+    newer = or_(current.is_(None), current < month)
+    db.execute(
+        update(DealerSummary)
+        .where(DealerSummary.dealer_id == dealer_id)
+        .values({
+            DealerSummary.month_sales_count: case(
+                (current == month, DealerSummary.month_sales_count + 1),
+                (newer, 1),
+                else_=DealerSummary.month_sales_count,
+            ),
+            DealerSummary.month_sales_amount: case(
+                (current == month, DealerSummary.month_sales_amount + amount),
+                (newer, amount),
+                else_=DealerSummary.month_sales_amount,
+            ),
+            DealerSummary.month_start: case((newer, month), else_=current),
+        })
+    )
+
+
+def _remove_month_sale(db, dealer_id, sale_date, amount):
+    """
+    Remove a sale from the dealer's monthly counters if it falls in the tracked month.
+    """
+    if dealer_id is None or sale_date is None:
+        return
+    db.execute(
+        update(DealerSummary)
+        .where(DealerSummary.dealer_id == dealer_id, DealerSummary.month_start == _month_start(sale_date))
+        .values({
+            DealerSummary.month_sales_count: DealerSummary.month_sales_count - 1,
+            DealerSummary.month_sales_amount: DealerSummary.month_sales_amount - amount,
+        })
+    )
+
+
+def dealer_created(db, dealer_id):
+    """
+    Create the empty summary row for a new dealer.
+    """
+    db.add(DealerSummary(dealer_id=dealer_id))
+
+
+def dealer_deleted(db, dealer_id):
+    """
+    Remove the summary row of a deleted dealer.
+    """
+    db.execute(delete(DealerSummary).where(DealerSummary.dealer_id == dealer_id))
+
+
+def car_added(db, car):
+    """
+    Count a newly created car as in stock.
+    """
+    _increment(db, car.dealer_id, in_stock_count=1, inventory_value=car.price)
+
+
+def car_price_changed(db, car, old_price):
+    """
+    Adjust the inventory value after a car's price changed.
+    """
+    if car.sold_date is None:
+        _increment(db, car.dealer_id, inventory_value=car.price - old_price)
+
+
+def car_removed(db, car):
+    """
+    Remove a deleted car from the in-stock or sold counters.
+    """
+    if car.sold_date is None:
+        _increment(db, car.dealer_id, in_stock_count=-1, inventory_value=-car.price)
+        return
+    days = _days_to_sell(car, car.sold_date)
+    _increment(
+        db, car.dealer_id, sold_count=-1,
+        days_to_sell_total=-(days or 0), days_to_sell_count=-1 if days is not None else 0,
+    )
+
+
+def mark_car_sold(db, car, sale_date):
+    """
+    Record the sale date on a car that is still in stock.
+
+    The update only matches a car without a sold_date, so of two concurrent
+    sales of the same car only the first one to write succeeds.
+
+    Parameters:
+        db (Session): The database session.
+        car (Car): The car being sold.
+        sale_date (date): The date of the sale.
+
+    Returns:
+        bool: True if the car was in stock, False if it had already been sold.
+    """
+    result = db.execute(
+        update(Car)
+        .where(Car.id == car.id, Car.dealer_id == car.dealer_id, Car.sold_date.is_(None))
+        .values(sold_date=sale_date)
+    )
+    return result.rowcount == 1
+
+
+def sale_added(db, dealer_id, sale_date, sale_amount, car):
+    """
+    Count a sale for the selling dealer and move its car from in stock to sold.
+    """
+    _add_month_sale(db, dealer_id, sale_date, sale_amount)
+    if car is None:
+        return
+    car.sold_date = sale_date
+    days = _days_to_sell(car, sale_date)
+    _increment(
+        db, car.dealer_id, in_stock_count=-1, inventory_value=-car.price, sold_count=1,
+        days_to_sell_total=days or 0, days_to_sell_count=1 if days is not None else 0,
+    )
+
+
+def sale_removed(db, dealer_id, sale_date, sale_amount, car):
+    """
+    Undo sale_added for a sale that is being deleted or changed.
+    """
+    _remove_month_sale(db, dealer_id, sale_date, sale_amount)
+    if car is None:
+        return
+    car.sold_date = None
+    days = _days_to_sell(car, sale_date)
+    _increment(
+        db, car.dealer_id, in_stock_count=1, inventory_value=car.price, sold_count=-1,
+        days_to_sell_total=-(days or 0), days_to_sell_count=-1 if days is not None else 0,
+    )
+
+
+def _shard_bind(shard_id):
+    """
+    Return the bind arguments that run a statement on the given shard, or None when sharding is off.
+    """
+    return {"shard_id": shard_id} if shard_id is not None else None
+
+
+def customer_sale_added(db, customer_id, sale_date, sale_amount, shard_id=None):
+    """
+    Count a sale in the customer's lifetime totals, creating the totals row on the first sale.
+
+    In sharded mode each shard keeps the totals of the sales stored on it, and
+    shard_id is the shard of the sale.
+    """
+    if customer_id is None:
+        return
+    first, last = CustomerSummary.first_purchase_date, CustomerSummary.last_purchase_date
+    totals = {
+        "sale_count": CustomerSummary.sale_count + 1,
+        "total_spent": CustomerSummary.total_spent + sale_amount,
+    }
+    if sale_date is not None:
+        totals["first_purchase_date"] = case((or_(first.is_(None), first > sale_date), sale_date), else_=first)
+        totals["last_purchase_date"] = case((or_(last.is_(None), last < sale_date), sale_date), else_=last)
+    db.execute(
+        sqlite_insert(CustomerSummary)
+        .values(
+            customer_id=customer_id, sale_count=1, total_spent=sale_amount,
+            first_purchase_date=sale_date, last_purchase_date=sale_date,
+        )
+        .on_conflict_do_update(index_elements=[CustomerSummary.customer_id], set_=totals),
+        bind_arguments=_shard_bind(shard_id),
+    )
+
+
+def customer_sale_removed(db, customer_id, sale_date, sale_amount, shard_id=None):
+    """
+    Undo customer_sale_added for a sale that was deleted or changed.
+
+    Must run after the change to the sale is flushed: when the sale was the
+    customer's first or last purchase, the new date is looked up through the
+    (customer_id, sale_date) index of the sales table and in the archives.
+    """
+    # Imported here because partitions imports shards, which imports this module.
+    import partitions
+
+    if customer_id is None:
+        return
+    first, last = CustomerSummary.first_purchase_date, CustomerSummary.last_purchase_date
+    customer_sales = select(Sale.sale_date).where(Sale.customer_id == customer_id)
+    new_first = customer_sales.with_only_columns(func.min(Sale.sale_date)).scalar_subquery()
+    new_last = customer_sales.with_only_columns(func.max(Sale.sale_date)).scalar_subquery()
+    dates = db.execute(
+        select(first, last).where(CustomerSummary.customer_id == customer_id), bind_arguments=_shard_bind(shard_id)
+    ).one_or_none()
+    if dates is not None and sale_date in dates:
+        archived_first, archived_last = partitions.get_archived_purchase_dates(db, customer_id)
+        # SQLite's multi-argument min() and max() return NULL if any argument is NULL.
+        if archived_first is not None:
+            new_first = func.coalesce(func.min(new_first, archived_first), archived_first)
+            new_last = func.coalesce(func.max(new_last, archived_last), archived_last)
+    db.execute(
+        update(CustomerSummary)
+        .where(CustomerSummary.customer_id == customer_id)
+        .values({
+            CustomerSummary.sale_count: CustomerSummary.sale_count - 1,
+            CustomerSummary.total_spent: CustomerSummary.total_spent - sale_amount,
+            first: case((first == sale_date, new_first), else_=first),
+            last: case((last == sale_date, new_last), else_=last),
+        })
+        .execution_options(synchronize_session=False),
+        bind_arguments=_shard_bind(shard_id),
+    )
+
+
+def customer_deleted(db, customer_id):
+    """
+    Remove the totals of a deleted customer.
+    """
+    db.execute(delete(CustomerSummary).where(CustomerSummary.customer_id == customer_id))
+
+
+def get_summary(db, dealer_id):
+    """
+    Read a dealer's summary as a dict matching schemas.DealerSummaryResponse.
+
+    Parameters:
+        db (Session): The database session.
+        dealer_id (int): The ID of the dealer.
+
+    Returns:
+        dict: The dealer's summary, or None if the dealer does not exist.
+    """
+    summary = db.get(DealerSummary, dealer_id)
+    if summary is None:
+        return None
+    this_month = summary.month_start == _month_start(date.today())
+    return {
+        "dealer_id": summary.dealer_id,
+        "in_stock_count": summary.in_stock_count,
+        "sold_count": summary.sold_count,
+        "inventory_value": summary.inventory_value,
+        "sales_this_month": summary.month_sales_count if this_month else 0,
+        "sales_this_month_amount": summary.month_sales_amount if this_month else 0.0,
+        "average_days_to_sell": (
+            summary.days_to_sell_total / summary.days_to_sell_count if summary.days_to_sell_count else None
+        ),
+    }
+
+
+def get_customer_totals(db, customer_id):
+    """
+    Read a customer's lifetime totals as a dict matching schemas.CustomerSummaryResponse.
+
+    Parameters:
+        db (Session): The database session.
+        customer_id (int): The ID of the customer.
+
+    Returns:
+        dict: The customer's totals, zero for a customer without sales.
+    """
+    # One row per shard holding sales of the customer in sharded mode, at most one otherwise.
+    rows = db.query(CustomerSummary).filter(CustomerSummary.customer_id == customer_id).all()
+    first_dates = [row.first_purchase_date for row in rows if row.first_purchase_date is not None]
+    last_dates = [row.last_purchase_date for row in rows if row.last_purchase_date is not None]
+    return {
+        "customer_id": customer_id,
+        "sale_count": sum(row.sale_count for row in rows),
+        "total_spent": sum(row.total_spent for row in rows),
+        "first_purchase_date": min(first_dates) if first_dates else None,
+        "last_purchase_date": max(last_dates) if last_dates else None,
+    }
+
+
+def rebuild_dealer_summaries(conn):
+    """
+    Recompute every dealer's summary from the cars and sales tables.
+
+    Cars count as sold by their sold_date, which is kept when their sale is
+    archived; the monthly counters only see sales still in the sales table.
+
+    Used when the summary table is first created and to repair drifted counters.
+
+    Parameters:
+        conn (Connection): A connection inside a transaction.
+    """
+    month = _month_start(date.today())
+    next_month = date(month.year + month.month // 12, month.month % 12 + 1, 1)
+    conn.execute(text("DELETE FROM dealer_summaries"))
+    conn.execute(
+        text("""
+            INSERT INTO dealer_summaries (
+                dealer_id, in_stock_count, sold_count, inventory_value, month_start,
+                month_sales_count, month_sales_amount, days_to_sell_total, days_to_sell_count
+            )
+            SELECT
+                d.id,
+                (SELECT count(*) FROM cars c WHERE c.dealer_id = d.id AND c.sold_date IS NULL),
+                (SELECT count(*) FROM cars c WHERE c.dealer_id = d.id AND c.sold_date IS NOT NULL),
+                (SELECT coalesce(sum(c.price), 0) FROM cars c WHERE c.dealer_id = d.id AND c.sold_date IS NULL),
+                :month,
+                (SELECT count(*) FROM sales s WHERE s.dealer_id = d.id
+                    AND s.sale_date >= :month AND s.sale_date < :next_month),
+                (SELECT coalesce(sum(s.sale_amount), 0) FROM sales s WHERE s.dealer_id = d.id
+                    AND s.sale_date >= :month AND s.sale_date < :next_month),
+                (SELECT coalesce(sum(max(CAST(julianday(c.sold_date) - julianday(c.listed_date) AS INTEGER), 0)), 0)
+                    FROM cars c
+                    WHERE c.dealer_id = d.id AND c.sold_date IS NOT NULL AND c.listed_date IS NOT NULL),
+                (SELECT count(*) FROM cars c
+                    WHERE c.dealer_id = d.id AND c.sold_date IS NOT NULL AND c.listed_date IS NOT NULL)
+            FROM dealers d
+        """),
+        {"month": month.isoformat(), "next_month": next_month.isoformat()},
+    )
+
+
+def rebuild_customer_summaries(conn, customer_ids=None):
+    """
+    Recompute customers' lifetime totals from the sales table and the archives.
+
+    Used when the totals table is first created, to repair drifted totals and,
+    in sharded mode, for the customers whose sales moved to another shard.
+
+    Parameters:
+        conn (Connection): A connection inside a transaction.
+        customer_ids (Iterable[int], optional): The customers to recompute. Defaults to None, every customer.
+    """
+    import partitions
+
+    where, params = "customer_id IS NOT NULL", {}
+    if customer_ids is not None:
+        where += " AND customer_id IN :customer_ids"
+        params["customer_ids"] = list(customer_ids)
+
+    def statement(sql):
+        statement = text(sql)
+        return statement.bindparams(bindparam("customer_ids", expanding=True)) if params else statement
+
+    conn.execute(statement(f"DELETE FROM customer_summaries WHERE {where}"), params)
+    conn.execute(
+        statement(f"""
+            INSERT INTO customer_summaries (
+                customer_id, sale_count, total_spent, first_purchase_date, last_purchase_date
+            )
+            SELECT customer_id, count(*), coalesce(sum(sale_amount), 0), min(sale_date), max(sale_date)
+            FROM sales
+            WHERE {where}
+            GROUP BY customer_id
+        """),
+        params,
+    )
+    archived = partitions.read_archived_customer_totals(conn, params.get("customer_ids"))
+    if archived:
+        conn.execute(
+            text("""
+                INSERT INTO customer_summaries (
+                    customer_id, sale_count, total_spent, first_purchase_date, last_purchase_date
+                )
+                VALUES (:customer_id, :sale_count, :total_spent, :first_purchase_date, :last_purchase_date)
+                ON CONFLICT (customer_id) DO UPDATE SET
+                    sale_count = sale_count + excluded.sale_count,
+                    total_spent = total_spent + excluded.total_spent,
+                    first_purchase_date = coalesce(
+                        min(first_purchase_date, excluded.first_purchase_date), excluded.first_purchase_date
+                    ),
+                    last_purchase_date = coalesce(
+                        max(last_purchase_date, excluded.last_purchase_date), excluded.last_purchase_date
+                    )
+            """),
+            archived,
+        )
@@ -0,0 +1,61 @@
+# tests/conftest.py
+import os
+import shutil
+import sys
+import tempfile
+import pytest
+
+# The app reads its configuration when it is imported, so point it at a scratch database first.
+TMP_DIR = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(TMP_DIR, 'test.db')}"
+os.environ["SALES_ARCHIVE_DIR"] = os.path.join(TMP_DIR, "sales_archive")
+os.environ.pop("VIN_INDEX", None)
+os.environ.pop("SHARD_URLS", None)
+os.environ.pop("STARTUP_MODE", None)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient  # noqa: E402
+from db import Base, engine  # noqa: E402
+from migrations import upgrade  # noqa: E402
+import main  # noqa: E402
+import vins  # noqa: E402
+
+# Run in their own interpreter by test_sharding.py.
+collect_ignore = ["sharded"]
+
+
+@pytest.fixture
+def client():
+    """
+    A test client for the app on empty tables.
+    """
+    engine.dispose()
+    Base.metadata.drop_all(bind=engine)
+    upgrade(engine)
+    shutil.rmtree(os.environ["SALES_ARCHIVE_DIR"], ignore_errors=True)
+    # The in-process VIN index outlives the tables dropped between tests.
+    vins._car_ids_by_vin.clear()
+    vins._vins_by_car_id.clear()
+    vins._applied_seqs.clear()
+    vins._synced_commit_count = None
+    with TestClient(main.app) as test_client:
+        yield test_client
+    engine.dispose()
+
+
+@pytest.fixture
+def dealer(client):
+    """
+    A dealer without cars.
+    """
+    return client.post("/dealers/", json={"name": "Test Motors", "location": "Here", "contact_info": ""}).json()
+
+
+@pytest.fixture
+def customer(client):
+    """
+    A customer without sales.
+    """
+    return client.post(
+        "/customers/", json={"first_name": "Ada", "last_name": "Buyer", "contact_info": "", "address": ""}
+    ).json()
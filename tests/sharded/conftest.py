@@ -0,0 +1,68 @@
+# tests/sharded/conftest.py
+"""
+Fixtures for running the app split over two shard databases.
+
+Sharding is configured when the app is imported, so these tests run in their
+own interpreter; tests/test_sharding.py starts it.
+"""
+import os
+import sys
+import tempfile
+import pytest
+
+TMP_DIR = tempfile.mkdtemp()
+DATABASE_PATHS = [os.path.join(TMP_DIR, name) for name in ("main.db", "shard_0.db", "shard_1.db")]
+os.environ["DATABASE_URL"] = f"sqlite:///{DATABASE_PATHS[0]}"
+os.environ["SHARD_URLS"] = ",".join(f"sqlite:///{path}" for path in DATABASE_PATHS[1:])
+os.environ["SALES_ARCHIVE_DIR"] = os.path.join(TMP_DIR, "sales_archive")
+os.environ.pop("STARTUP_MODE", None)
+os.environ.pop("VIN_INDEX", None)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from fastapi.testclient import TestClient  # noqa: E402
+from migrations import upgrade  # noqa: E402
+import db  # noqa: E402
+import main  # noqa: E402
+import shards  # noqa: E402
+import vins  # noqa: E402
+
+
+@pytest.fixture
+def client():
+    """
+    A test client for the app on empty shards and an empty directory.
+    """
+    for engine in [db.engine, *shards.engines.values()]:
+        engine.dispose()
+    for path in DATABASE_PATHS:
+        if os.path.exists(path):
+            os.remove(path)
+    shards.prepare(upgrade)
+    # The VIN index outlives the databases, whose IDs start over.
+    vins._car_ids_by_vin.clear()
+    vins._vins_by_car_id.clear()
+    vins._applied_seqs.clear()
+    vins._synced_commit_count = None
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def dealers(client):
+    """
+    Two dealers, which the directory places on shards 0 and 1.
+    """
+    return [
+        client.post("/dealers/", json={"name": f"Dealer {index}", "location": "Here", "contact_info": ""}).json()
+        for index in range(2)
+    ]
+
+
+@pytest.fixture
+def customer(client):
+    """
+    A customer, replicated to both shards.
+    """
+    return client.post(
+        "/customers/", json={"first_name": "Ada", "last_name": "Buyer", "contact_info": "", "address": ""}
+    ).json()
@@ -0,0 +1,175 @@
+# tests/sharded/test_shards.py
+"""
+Tests for dealer sharding: routing, ID interleaving, customer replication,
+merged pagination, VIN uniqueness and moving dealers between shards.
+"""
+from datetime import date
+from sqlalchemy import select
+from migrations import upgrade
+from models import Car, Customer
+import shards
+import vins
+
+TODAY = date.today().isoformat()
+
+
+def add_car(client, dealer, vin, price=100.0):
+    return client.post("/cars/", json={
+        "make": "Make", "model": "Model", "year": 2020, "color": "Red", "vin": vin,
+        "price": price, "dealer_id": dealer["id"],
+    })
+
+
+def sell(client, dealer, car, customer, amount=90.0):
+    return client.post("/sales/", json={
+        "sale_date": TODAY, "sale_amount": amount, "payment_method": "Cash",
+        "dealer_id": dealer["id"], "car_id": car["id"], "customer_id": customer["id"],
+    })
+
+
+def rows(shard_id, statement):
+    with shards.engines[shard_id].connect() as conn:
+        return conn.execute(statement).all()
+
+
+def feed(client, shard_id):
+    return [
+        (change["op"], change["entity"], change["entity_id"])
+        for change in client.get("/changes", params={"shard": shard_id, "limit": 1000}).json()["changes"]
+    ]
+
+
+def test_dealers_spread_over_shards_and_ids_interleave(client, dealers):
+    assert [shards.lookup_dealer(dealer["id"]) for dealer in dealers] == ["0", "1"]
+
+    cars = [add_car(client, dealer, f"VIN{index}").json() for index, dealer in enumerate(dealers)]
+    assert [car["id"] % shards.MAX_SHARDS for car in cars] == [0, 1]
+    assert rows("1", select(Car.id)) == [(cars[1]["id"],)]
+
+
+def test_crud_on_second_shard(client, dealers, customer):
+    dealer = dealers[1]
+    car = add_car(client, dealer, "VIN1").json()
+    sale = sell(client, dealer, car, customer).json()
+    assert client.get(f"/sales/{sale['id']}").json()["car"]["id"] == car["id"]
+
+    fields = {key: car[key] for key in ("make", "model", "year", "color", "vin")}
+    assert client.put(f"/cars/{car['id']}", json=dict(fields, price=150.0)).json()["price"] == 150.0
+    assert client.delete(f"/sales/{sale['id']}").status_code == 200
+    assert client.delete(f"/cars/{car['id']}").status_code == 200
+    assert client.get(f"/cars/{car['id']}").status_code == 404
+    assert rows("1", select(Car.id)) == []
+
+
+def test_customers_are_replicated(client, customer):
+    for shard_id in shards.SHARD_IDS:
+        assert rows(shard_id, select(Customer.first_name)) == [("Ada",)]
+    response = client.put(
+        f"/customers/{customer['id']}",
+        json={"first_name": "Grace", "last_name": "Buyer", "contact_info": "", "address": ""},
+    )
+    assert response.status_code == 200
+    for shard_id in shards.SHARD_IDS:
+        assert rows(shard_id, select(Customer.first_name)) == [("Grace",)]
+
+
+def test_sale_of_a_car_on_another_shard_is_rejected(client, dealers, customer):
+    car = add_car(client, dealers[1], "VIN1").json()
+    assert sell(client, dealers[0], car, customer).status_code == 422
+
+
+def test_lists_merge_shards_in_id_order(client, dealers):
+    for index in range(3):
+        for dealer in dealers:
+            add_car(client, dealer, f"VIN{dealer['id']}-{index}")
+    ids = [car["id"] for car in client.get("/cars/", params={"limit": 100}).json()]
+    assert len(ids) == 6
+    assert ids == sorted(ids)
+    page = [car["id"] for car in client.get("/cars/", params={"skip": 2, "limit": 3}).json()]
+    assert page == ids[2:5]
+
+
+def test_dealer_criteria_route_to_one_shard():
+    assert shards._criteria_dealer_ids(select(Car).where(Car.dealer_id == 5), {}) == {5}
+    assert shards._criteria_dealer_ids(select(Car).where(Car.dealer_id.in_([1, 2])), {}) == {1, 2}
+    assert shards._criteria_dealer_ids(select(Car).where(Car.vin == "VIN1"), {}) is None
+    assert shards._criteria_dealer_ids(select(Car), {}) is None
+
+
+def test_vin_is_unique_across_shards(client, dealers, monkeypatch):
+    car = add_car(client, dealers[0], "VIN1").json()
+    other = add_car(client, dealers[1], "VIN2").json()
+    assert add_car(client, dealers[1], "VIN1").status_code == 409
+    assert client.get("/cars/by-vin/VIN1").json()["id"] == car["id"]
+
+    # A concurrent request, or another process's stale VIN index, passes the pre-check.
+    monkeypatch.setattr(vins, "lookup_car_id", lambda db, vin: None)
+    assert add_car(client, dealers[1], "VIN1").status_code == 409
+    fields = {key: other[key] for key in ("make", "model", "year", "color", "price")}
+    assert client.put(f"/cars/{other['id']}", json=dict(fields, vin="VIN1")).status_code == 409
+
+    client.delete(f"/cars/{car['id']}")
+    assert add_car(client, dealers[1], "VIN1").status_code == 200
+    # The rejected change released nothing: VIN2 is still taken.
+    assert add_car(client, dealers[0], "VIN2").status_code == 409
+
+
+def test_move_dealer_keeps_summaries_feeds_and_vins(client, dealers, customer, monkeypatch):
+    dealer = dealers[0]
+    car = add_car(client, dealer, "VIN1", price=100.0).json()
+    add_car(client, dealer, "VIN2", price=50.0)
+    sale = sell(client, dealer, car, customer, amount=95.0).json()
+    summary = client.get(f"/dealers/{dealer['id']}/summary").json()
+    totals = client.get(f"/customers/{customer['id']}/sales", params={"include_totals": True}).json()["totals"]
+    source_feed = feed(client, "0")
+
+    shards.move_dealer(dealer["id"], "1", grace_period=0)
+    # Sync the VIN index from both shards' change logs on the next lookup.
+    monkeypatch.setattr(vins, "SYNC_INTERVAL", 0)
+
+    assert shards.lookup_dealer(dealer["id"]) == "1"
+    assert rows("0", select(Car.id)) == []
+    assert client.get(f"/dealers/{dealer['id']}/summary").json() == summary
+    moved = client.get(f"/customers/{customer['id']}/sales", params={"include_totals": True}).json()
+    assert moved["totals"] == totals
+    assert [item["id"] for item in moved["items"]] == [sale["id"]]
+    assert ("delete", "cars", car["id"]) in feed(client, "0")[len(source_feed):]
+    assert ("insert", "cars", car["id"]) in feed(client, "1")
+    assert client.get("/cars/by-vin/VIN1").json()["id"] == car["id"]
+
+    fields = {key: car[key] for key in ("make", "model", "year", "color", "vin")}
+    assert client.put(f"/cars/{car['id']}", json=dict(fields, price=120.0)).status_code == 200
+    assert add_car(client, dealers[1], "VIN2").status_code == 409
+
+
+def test_writes_to_a_moving_dealer_are_rejected(client, dealers):
+    from sqlalchemy import update
+
+    with shards.directory_engine.begin() as conn:
+        conn.execute(
+            update(shards.dealer_shards).where(shards.dealer_shards.c.dealer_id == dealers[0]["id"]).values(moving=True)
+        )
+    response = add_car(client, dealers[0], "VIN1")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+
+def test_plan_rebalance_moves_largest_fitting_dealer():
+    loads = {"0": {1: 50, 2: 30, 3: 20}, "1": {4: 10}}
+    assert shards.plan_rebalance(loads) == [(1, "0", "1")]
+    assert shards.plan_rebalance({"0": {1: 10}, "1": {2: 10}}) == []
+
+
+def test_startup_reconciles_vin_claims(client, dealers):
+    from sqlalchemy import delete, insert
+
+    car = add_car(client, dealers[1], "VIN1").json()
+    with shards.directory_engine.begin() as conn:
+        conn.execute(delete(shards.car_vins))
+        conn.execute(insert(shards.car_vins).values(vin="LEFT-BEHIND", car_id=12345, claimed_at=0.0))
+
+    shards.prepare(upgrade)
+
+    with shards.directory_engine.connect() as conn:
+        claims = conn.execute(select(shards.car_vins.c.vin, shards.car_vins.c.car_id)).all()
+    assert claims == [("VIN1", car["id"])]
@@ -0,0 +1,35 @@
+# tests/test_batch.py
+"""
+Tests for the batch read endpoints.
+"""
+from schemas import MAX_BATCH_IDS
+from test_summaries import add_car
+
+
+def test_batch_keeps_request_order_duplicates_and_missing_ids(client, dealer):
+    cars = [add_car(client, dealer, f"VIN{index}") for index in range(3)]
+    ids = [cars[2]["id"], 999, cars[0]["id"], cars[2]["id"], 999]
+
+    for response in (
+        client.get("/cars/batch", params={"ids": ",".join(map(str, ids))}),
+        client.post("/cars/batch-get", json={"ids": ids}),
+    ):
+        assert response.status_code == 200
+        assert [car["id"] for car in response.json()["items"]] == [cars[2]["id"], cars[0]["id"], cars[2]["id"]]
+        assert response.json()["missing"] == [999]
+
+
+def test_batch_of_other_resources(client, dealer, customer):
+    for path, item in (("dealers", dealer), ("customers", customer)):
+        response = client.get(f"/{path}/batch", params={"ids": f"{item['id']},0"}).json()
+        assert [found["id"] for found in response["items"]] == [item["id"]]
+        assert response["missing"] == [0]
+    assert client.get("/sales/batch", params={"ids": "5"}).json() == {"items": [], "missing": [5]}
+
+
+def test_batch_rejects_too_many_or_malformed_ids(client):
+    too_many = list(range(MAX_BATCH_IDS + 1))
+    assert client.get("/cars/batch", params={"ids": ",".join(map(str, too_many))}).status_code == 422
+    assert client.post("/cars/batch-get", json={"ids": too_many}).status_code == 422
+    assert client.get("/cars/batch", params={"ids": ",".join(map(str, too_many[:-1]))}).status_code == 200
+    assert client.get("/cars/batch", params={"ids": "1,x"}).status_code == 422
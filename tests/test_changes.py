@@ -0,0 +1,44 @@
+# tests/test_changes.py
+import asyncio
+import time
+import httpx
+import main
+
+
+def test_long_poll_returns_new_changes(client):
+    since = client.get("/changes").json()["last_seq"]
+    client.post("/dealers/", json={"name": "Test Motors", "location": "Here", "contact_info": ""})
+
+    feed = client.get("/changes", params={"since": since, "wait": 5}).json()
+    assert [(change["entity"], change["op"]) for change in feed["changes"]] == [("dealers", "insert")]
+    assert client.get("/changes", params={"since": feed["last_seq"], "wait": 0.2}).json()["changes"] == []
+
+
+def test_waiting_consumers_do_not_block_other_requests(client):
+    # More waiting consumers than the threadpool has threads.
+    consumers = 60
+
+    async def run():
+        def http(index):
+            transport = httpx.ASGITransport(app=main.app, client=(f"10.0.{index // 250}.{index % 250}", 1234))
+            return httpx.AsyncClient(transport=transport, base_url="http://test")
+
+        pollers = [http(index) for index in range(consumers)]
+        waits = [asyncio.create_task(poller.get("/changes", params={"wait": 10})) for poller in pollers]
+        await asyncio.sleep(0.5)
+        start = time.monotonic()
+        async with http(consumers) as writer:
+            created = await writer.post(
+                "/dealers/", json={"name": "Test Motors", "location": "Here", "contact_info": ""}
+            )
+        write_seconds = time.monotonic() - start
+        responses = await asyncio.gather(*waits)
+        for poller in pollers:
+            await poller.aclose()
+        return created, write_seconds, responses, time.monotonic() - start
+
+    created, write_seconds, responses, total_seconds = asyncio.run(run())
+    assert created.status_code == 200
+    assert write_seconds < 2
+    assert all(response.status_code == 200 and response.json()["changes"] for response in responses)
+    assert total_seconds < 5
@@ -0,0 +1,46 @@
+# tests/test_formats.py
+"""
+Tests for Accept negotiation and the binary list response formats.
+"""
+import sys
+import pytest
+import formats
+from test_summaries import add_car
+
+
+def test_negotiate_follows_q_values():
+    assert formats.negotiate(None) is None
+    assert formats.negotiate("application/json") is None
+    assert formats.negotiate("application/msgpack") == formats.MSGPACK_MEDIA_TYPE
+    assert formats.negotiate("application/x-msgpack") == formats.MSGPACK_MEDIA_TYPE
+    assert formats.negotiate("application/json;q=0.5, application/vnd.apache.arrow.stream") == formats.ARROW_MEDIA_TYPE
+    assert formats.negotiate("application/msgpack;q=0.5, application/json") is None
+    assert formats.negotiate("application/msgpack;q=0, */*") is None
+    assert formats.negotiate("text/html, application/msgpack;q=0.9") == formats.MSGPACK_MEDIA_TYPE
+
+
+def test_binary_list_responses(client, dealer):
+    # Both encoders are optional dependencies.
+    msgpack = pytest.importorskip("msgpack")
+    pa = pytest.importorskip("pyarrow")
+    cars = [add_car(client, dealer, f"VIN{index}", price=10.0 * index) for index in range(3)]
+
+    response = client.get("/cars/", headers={"Accept": formats.MSGPACK_MEDIA_TYPE})
+    assert response.headers["content-type"] == formats.MSGPACK_MEDIA_TYPE
+    columns = msgpack.unpackb(response.content)
+    assert columns["id"] == [car["id"] for car in cars]
+    assert columns["price"] == [0.0, 10.0, 20.0]
+
+    response = client.get("/cars/", headers={"Accept": formats.ARROW_MEDIA_TYPE})
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert table.column("vin").to_pylist() == ["VIN0", "VIN1", "VIN2"]
+
+
+def test_missing_encoder_package_returns_406(client, dealer, monkeypatch):
+    add_car(client, dealer, "VIN1")
+    # A None entry in sys.modules makes importing the package raise ImportError.
+    monkeypatch.setitem(sys.modules, "msgpack", None)
+    monkeypatch.setitem(sys.modules, "pyarrow", None)
+    for media_type in (formats.MSGPACK_MEDIA_TYPE, formats.ARROW_MEDIA_TYPE):
+        assert client.get("/cars/", headers={"Accept": media_type}).status_code == 406
+    assert client.get("/cars/", headers={"Accept": "application/json"}).status_code == 200
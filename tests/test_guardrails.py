@@ -0,0 +1,98 @@
+# tests/test_guardrails.py
+"""
+Tests for the limits that keep one expensive request from slowing down everyone else.
+"""
+import asyncio
+import httpx
+from fastapi.responses import JSONResponse
+import guardrails
+from test_summaries import add_car, sell
+
+
+def test_single_reads_check_the_expansion_estimate(client, dealer, customer, monkeypatch):
+    cars = [add_car(client, dealer, f"VIN{index}") for index in range(3)]
+    sell(client, dealer, cars[0], customer)
+    # The dealer, 2 cars in stock, and a sold car with its sale: 5 rows, 6 with the requested car.
+    monkeypatch.setattr(guardrails, "MAX_EXPANSION_ROWS", 4)
+
+    for path in ("/dealers/", f"/dealers/{dealer['id']}", "/cars/", f"/cars/{cars[1]['id']}", "/cars/by-vin/VIN1"):
+        assert client.get(path).status_code == 422, path
+
+    monkeypatch.setattr(guardrails, "MAX_EXPANSION_ROWS", 6)
+    for path in (f"/dealers/{dealer['id']}", f"/cars/{cars[1]['id']}", "/cars/by-vin/VIN1"):
+        assert client.get(path).status_code == 200, path
+    assert client.get("/dealers/999").status_code == 404
+
+
+def test_customer_read_checks_the_expansion_estimate(client, dealer, customer, monkeypatch):
+    for index in range(3):
+        sell(client, dealer, add_car(client, dealer, f"VIN{index}"), customer)
+    monkeypatch.setattr(guardrails, "MAX_EXPANSION_ROWS", 6)
+    assert client.get(f"/customers/{customer['id']}").status_code == 422
+    monkeypatch.setattr(guardrails, "MAX_EXPANSION_ROWS", 7)
+    assert client.get(f"/customers/{customer['id']}").status_code == 200
+
+
+def test_page_size_is_capped(client):
+    assert client.get("/cars/", params={"limit": guardrails.MAX_PAGE_SIZE}).status_code == 200
+    assert client.get("/cars/", params={"limit": guardrails.MAX_PAGE_SIZE + 1}).status_code == 422
+
+
+def test_slow_statement_returns_503(client, dealer, monkeypatch):
+    # Check the deadline after every instruction, and let it pass as soon as a statement starts.
+    monkeypatch.setattr(guardrails, "PROGRESS_STEPS", 1)
+    monkeypatch.setattr(guardrails, "STATEMENT_TIMEOUT", 1e-9)
+    response = client.get("/dealers/")
+    assert response.status_code == 503
+    assert response.json()["detail"] == "Query exceeded the statement timeout"
+
+    monkeypatch.setattr(guardrails, "STATEMENT_TIMEOUT", 0)
+    assert client.get("/dealers/").status_code == 200
+
+
+def concurrent_statuses(middleware, clients):
+    """
+    Send one request per (address, headers) in clients while the first one is still in flight.
+    """
+    async def run():
+        started, release = asyncio.Event(), asyncio.Event()
+
+        async def app(scope, receive, send):
+            if not started.is_set():
+                started.set()
+                await release.wait()
+            await JSONResponse({})(scope, receive, send)
+
+        handler = middleware(app)
+
+        async def get(address, headers):
+            transport = httpx.ASGITransport(app=handler, client=(address, 1234))
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+                return (await http.get("/", headers=headers)).status_code
+
+        first = asyncio.create_task(get(*clients[0]))
+        await started.wait()
+        others = [await get(*client) for client in clients[1:]]
+        release.set()
+        return [await first] + others
+
+    return asyncio.run(run())
+
+
+def test_per_client_concurrency_limit(monkeypatch):
+    def limited(app):
+        return guardrails.ClientConcurrencyMiddleware(app, max_requests=1)
+
+    assert concurrent_statuses(limited, [("10.0.0.1", {}), ("10.0.0.1", {}), ("10.0.0.2", {})]) == [200, 429, 200]
+
+    monkeypatch.setattr(guardrails, "CLIENT_ID_HEADER", "x-api-key")
+    statuses = concurrent_statuses(limited, [
+        ("10.0.0.1", {"X-Api-Key": "a"}), ("10.0.0.1", {"X-Api-Key": "a"}), ("10.0.0.1", {"X-Api-Key": "b"}),
+    ])
+    assert statuses == [200, 429, 200]
+
+
+def test_per_client_concurrency_limit_is_off_by_default():
+    assert guardrails.MAX_CONCURRENT_REQUESTS_PER_CLIENT == 0
+    unlimited = guardrails.ClientConcurrencyMiddleware
+    assert concurrent_statuses(unlimited, [("10.0.0.1", {})] * 3) == [200, 200, 200]
@@ -0,0 +1,49 @@
+# tests/test_partitions.py
+"""
+Tests for reading sales moved into yearly archive files.
+"""
+from db import engine
+import partitions
+from test_summaries import add_car, sell
+
+YEARS = range(2005, 2017)
+
+
+def archive_sales(client, dealer, customer):
+    """
+    Sell one car in each of YEARS and archive every year, more archives than SQLite can attach at once.
+    """
+    sales = []
+    for year in YEARS:
+        car = add_car(client, dealer, f"VIN{year}")
+        sales.append(sell(client, dealer, car, customer, sale_date=f"{year}-06-01").json())
+    for year in YEARS:
+        assert partitions.archive_year(engine, year) == 1
+    return sales
+
+
+def test_archived_sales_are_read_from_many_archives(client, dealer, customer):
+    sales = archive_sales(client, dealer, customer)
+    ids = [sale["id"] for sale in sales]
+
+    response = client.get(f"/sales/{ids[0]}")
+    assert response.status_code == 200
+    assert response.json()["sale_date"] == "2005-06-01"
+
+    batch = client.get("/sales/batch", params={"ids": ",".join(map(str, reversed(ids + [999])))}).json()
+    assert [sale["id"] for sale in batch["items"]] == ids[::-1]
+    assert batch["missing"] == [999]
+
+    listed = client.get("/sales/", params={"include_archived": True, "skip": 1, "limit": 100}).json()
+    assert [sale["id"] for sale in listed] == ids[1:]
+
+    history = client.get(f"/customers/{customer['id']}/sales", params={"limit": 100}).json()
+    assert [sale["sale_date"] for sale in history["items"]] == [f"{year}-06-01" for year in reversed(YEARS)]
+
+
+def test_archived_sales_are_read_only(client, dealer, customer):
+    sale = archive_sales(client, dealer, customer)[-1]
+
+    update = {"sale_date": sale["sale_date"], "sale_amount": 1.0, "payment_method": "Card"}
+    assert client.put(f"/sales/{sale['id']}", json=update).status_code == 409
+    assert client.delete(f"/sales/{sale['id']}").status_code == 409
@@ -0,0 +1,20 @@
+# tests/test_sharding.py
+import os
+import subprocess
+import sys
+
+SHARDED_TESTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sharded")
+
+
+def test_sharded_mode():
+    """
+    Run tests/sharded in a fresh interpreter, since sharding is configured when the app is imported.
+    """
+    result = subprocess.run(
+        [
+            sys.executable, "-m", "pytest", "-q", "-p", "no:cacheprovider",
+            "--rootdir", SHARDED_TESTS, "--confcutdir", SHARDED_TESTS, SHARDED_TESTS,
+        ],
+        capture_output=True, text=True,
+    )
+    assert result.returncode == 0, result.stdout + result.stderr
@@ -0,0 +1,37 @@
+# tests/test_startup.py
+import os
+import subprocess
+import sys
+import tempfile
+from db import engine
+from migrations import SCHEMA_VERSION, ensure_schema, get_schema_version
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LAZY_APP = r"""
+import sys
+import main
+from fastapi.testclient import TestClient
+
+assert "router" not in sys.modules, "routes were imported at startup"
+with TestClient(main.app) as client:
+    created = client.post("/dealers/", json={"name": "Lazy Motors", "location": "Here", "contact_info": ""})
+    assert created.status_code == 200, created.text
+    assert client.get(f"/dealers/{created.json()['id']}").json()["name"] == "Lazy Motors"
+"""
+
+
+def test_lazy_startup_serves_first_request():
+    """
+    Start the app with STARTUP_MODE=lazy in a fresh interpreter, since the mode is read when main is imported.
+    """
+    tmp = tempfile.mkdtemp()
+    env = dict(os.environ, STARTUP_MODE="lazy", DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'lazy.db')}")
+    env.pop("SHARD_URLS", None)
+    result = subprocess.run([sys.executable, "-c", LAZY_APP], cwd=REPO_ROOT, env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+
+
+def test_schema_check_skips_current_database(client):
+    assert get_schema_version(engine) == SCHEMA_VERSION
+    assert ensure_schema(engine) is False
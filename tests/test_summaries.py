@@ -0,0 +1,223 @@
+# tests/test_summaries.py
+"""
+Regression tests for the write-maintained dealer summaries and customer totals.
+
+Every test goes through the HTTP routes and checks the counters against what
+a recount of the cars and sales would give.
+"""
+from datetime import date
+
+TODAY = date.today().isoformat()
+
+
+def add_car(client, dealer, vin, price=100.0):
+    response = client.post("/cars/", json={
+        "make": "Make", "model": "Model", "year": 2020, "color": "Red", "vin": vin,
+        "price": price, "dealer_id": dealer["id"],
+    })
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def sell(client, dealer, car, customer, amount=90.0, sale_date=TODAY):
+    return client.post("/sales/", json={
+        "sale_date": sale_date, "sale_amount": amount, "payment_method": "Cash",
+        "dealer_id": dealer["id"], "car_id": car["id"], "customer_id": customer["id"],
+    })
+
+
+def set_price(client, car, price):
+    fields = {key: car[key] for key in ("make", "model", "year", "color", "vin")}
+    response = client.put(f"/cars/{car['id']}", json=dict(fields, price=price))
+    assert response.status_code == 200, response.text
+
+
+def summary(client, dealer):
+    response = client.get(f"/dealers/{dealer['id']}/summary")
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def totals(client, customer):
+    response = client.get(f"/customers/{customer['id']}/sales", params={"include_totals": True})
+    assert response.status_code == 200, response.text
+    return response.json()["totals"]
+
+
+def assert_counters(client, dealer, in_stock, sold, inventory_value, sales_this_month):
+    counters = summary(client, dealer)
+    assert counters["in_stock_count"] == in_stock
+    assert counters["sold_count"] == sold
+    assert counters["inventory_value"] == inventory_value
+    assert counters["sales_this_month"] == sales_this_month
+
+
+def test_new_dealer_has_empty_summary(client, dealer):
+    assert_counters(client, dealer, in_stock=0, sold=0, inventory_value=0.0, sales_this_month=0)
+    assert summary(client, dealer)["average_days_to_sell"] is None
+
+
+def test_car_create_update_delete(client, dealer):
+    car = add_car(client, dealer, "VIN1", price=100.0)
+    add_car(client, dealer, "VIN2", price=50.0)
+    assert_counters(client, dealer, in_stock=2, sold=0, inventory_value=150.0, sales_this_month=0)
+
+    set_price(client, car, 120.0)
+    assert_counters(client, dealer, in_stock=2, sold=0, inventory_value=170.0, sales_this_month=0)
+
+    assert client.delete(f"/cars/{car['id']}").status_code == 200
+    assert_counters(client, dealer, in_stock=1, sold=0, inventory_value=50.0, sales_this_month=0)
+
+
+def test_sale_create_moves_car_to_sold(client, dealer, customer):
+    car = add_car(client, dealer, "VIN1", price=100.0)
+    add_car(client, dealer, "VIN2", price=50.0)
+
+    assert sell(client, dealer, car, customer, amount=95.0).status_code == 200
+    assert_counters(client, dealer, in_stock=1, sold=1, inventory_value=50.0, sales_this_month=1)
+    assert summary(client, dealer)["sales_this_month_amount"] == 95.0
+    assert summary(client, dealer)["average_days_to_sell"] == 0
+    assert totals(client, customer)["sale_count"] == 1
+    assert totals(client, customer)["total_spent"] == 95.0
+
+
+def test_sale_update_moves_amount_and_date(client, dealer, customer):
+    car = add_car(client, dealer, "VIN1", price=100.0)
+    sale = sell(client, dealer, car, customer, amount=95.0).json()
+
+    response = client.put(
+        f"/sales/{sale['id']}", json={"sale_date": "2021-06-01", "sale_amount": 80.0, "payment_method": "Card"}
+    )
+    assert response.status_code == 200
+    assert_counters(client, dealer, in_stock=0, sold=1, inventory_value=0.0, sales_this_month=0)
+    customer_totals = totals(client, customer)
+    assert customer_totals["sale_count"] == 1
+    assert customer_totals["total_spent"] == 80.0
+    assert customer_totals["first_purchase_date"] == "2021-06-01"
+    assert customer_totals["last_purchase_date"] == "2021-06-01"
+
+
+def test_sale_delete_returns_car_to_stock(client, dealer, customer):
+    car = add_car(client, dealer, "VIN1", price=100.0)
+    sale = sell(client, dealer, car, customer).json()
+
+    assert client.delete(f"/sales/{sale['id']}").status_code == 200
+    assert_counters(client, dealer, in_stock=1, sold=0, inventory_value=100.0, sales_this_month=0)
+    assert summary(client, dealer)["average_days_to_sell"] is None
+    assert totals(client, customer) == {
+        "customer_id": customer["id"], "sale_count": 0, "total_spent": 0.0,
+        "first_purchase_date": None, "last_purchase_date": None,
+    }
+
+
+def test_sold_car_price_change_and_delete(client, dealer, customer):
+    car = add_car(client, dealer, "VIN1", price=100.0)
+    add_car(client, dealer, "VIN2", price=50.0)
+    sell(client, dealer, car, customer)
+
+    set_price(client, car, 300.0)
+    assert_counters(client, dealer, in_stock=1, sold=1, inventory_value=50.0, sales_this_month=1)
+
+    assert client.delete(f"/cars/{car['id']}").status_code == 200
+    assert_counters(client, dealer, in_stock=1, sold=0, inventory_value=50.0, sales_this_month=1)
+
+
+def test_second_sale_of_car_is_rejected(client, dealer, customer):
+    car = add_car(client, dealer, "VIN1", price=100.0)
+    assert sell(client, dealer, car, customer).status_code == 200
+
+    response = sell(client, dealer, car, customer)
+    assert response.status_code == 409
+    assert_counters(client, dealer, in_stock=0, sold=1, inventory_value=0.0, sales_this_month=1)
+    assert totals(client, customer)["sale_count"] == 1
+
+
+def test_car_can_be_sold_again_after_its_sale_is_deleted(client, dealer, customer):
+    car = add_car(client, dealer, "VIN1", price=100.0)
+    sale = sell(client, dealer, car, customer).json()
+    client.delete(f"/sales/{sale['id']}")
+
+    assert sell(client, dealer, car, customer).status_code == 200
+    assert_counters(client, dealer, in_stock=0, sold=1, inventory_value=0.0, sales_this_month=1)
+
+
+def test_archived_sale_keeps_car_sold(client, dealer, customer):
+    from db import engine
+    import partitions
+
+    archived_car = add_car(client, dealer, "VIN1", price=100.0)
+    add_car(client, dealer, "VIN2", price=50.0)
+    assert sell(client, dealer, archived_car, customer, sale_date="2020-03-01").status_code == 200
+    assert partitions.archive_year(engine, 2020) == 1
+    assert_counters(client, dealer, in_stock=1, sold=1, inventory_value=50.0, sales_this_month=0)
+
+    assert sell(client, dealer, archived_car, customer).status_code == 409
+    set_price(client, archived_car, 300.0)
+    assert_counters(client, dealer, in_stock=1, sold=1, inventory_value=50.0, sales_this_month=0)
+
+    assert client.delete(f"/cars/{archived_car['id']}").status_code == 200
+    assert_counters(client, dealer, in_stock=1, sold=0, inventory_value=50.0, sales_this_month=0)
+
+
+def test_rebuild_counts_archived_sales_as_sold(client, dealer, customer):
+    from db import engine
+    import partitions
+    import summaries
+
+    car = add_car(client, dealer, "VIN1", price=100.0)
+    add_car(client, dealer, "VIN2", price=50.0)
+    sell(client, dealer, car, customer, sale_date="2020-03-01")
+    partitions.archive_year(engine, 2020)
+    before = summary(client, dealer)
+
+    with engine.begin() as conn:
+        summaries.rebuild_dealer_summaries(conn)
+    assert summary(client, dealer) == before
+
+
+def test_customer_sales_list_archived_sales(client, dealer, customer):
+    from db import engine
+    import partitions
+
+    archived_car = add_car(client, dealer, "VIN1")
+    car = add_car(client, dealer, "VIN2")
+    sell(client, dealer, archived_car, customer, sale_date="2020-03-01")
+    sell(client, dealer, car, customer)
+    partitions.archive_year(engine, 2020)
+
+    first = client.get(f"/customers/{customer['id']}/sales", params={"limit": 1}).json()
+    assert [sale["sale_date"] for sale in first["items"]] == [TODAY]
+    second = client.get(
+        f"/customers/{customer['id']}/sales", params={"limit": 1, "cursor": first["next_cursor"]}
+    ).json()
+    assert [sale["sale_date"] for sale in second["items"]] == ["2020-03-01"]
+    assert second["next_cursor"] is None
+    assert totals(client, customer)["sale_count"] == 2
+
+
+def test_customer_totals_keep_archived_purchase_dates(client, dealer, customer):
+    from db import engine
+    import partitions
+    import summaries
+
+    archived_car = add_car(client, dealer, "VIN1")
+    car = add_car(client, dealer, "VIN2")
+    sell(client, dealer, archived_car, customer, amount=30.0, sale_date="2020-03-01")
+    sale = sell(client, dealer, car, customer, amount=40.0).json()
+    partitions.archive_year(engine, 2020)
+    before = totals(client, customer)
+    assert before["sale_count"] == 2
+    with engine.begin() as conn:
+        summaries.rebuild_customer_summaries(conn)
+    assert totals(client, customer) == before
+
+    expected = {
+        "customer_id": customer["id"], "sale_count": 1, "total_spent": 30.0,
+        "first_purchase_date": "2020-03-01", "last_purchase_date": "2020-03-01",
+    }
+    assert client.delete(f"/sales/{sale['id']}").status_code == 200
+    assert totals(client, customer) == expected
+
+    with engine.begin() as conn:
+        summaries.rebuild_customer_summaries(conn)
+    assert totals(client, customer) == expected
@@ -0,0 +1,59 @@
+# tests/test_vins.py
+"""
+Tests for the in-process VIN index and its sync from the change log.
+"""
+from sqlalchemy import insert
+from db import engine
+from models import Car
+import changes
+import vins
+from test_summaries import add_car
+
+
+def by_vin(client, vin):
+    response = client.get(f"/cars/by-vin/{vin}")
+    return response.json()["id"] if response.status_code == 200 else response.status_code
+
+
+def test_index_follows_create_update_and_delete(client, dealer):
+    assert by_vin(client, "VIN1") == 404
+    car = add_car(client, dealer, "VIN1")
+    assert by_vin(client, "VIN1") == car["id"]
+
+    fields = {key: car[key] for key in ("make", "model", "year", "color", "price")}
+    assert client.put(f"/cars/{car['id']}", json=dict(fields, vin="VIN2")).status_code == 200
+    assert by_vin(client, "VIN1") == 404
+    assert by_vin(client, "VIN2") == car["id"]
+
+    assert client.delete(f"/cars/{car['id']}").status_code == 200
+    assert by_vin(client, "VIN2") == 404
+    assert vins._car_ids_by_vin == {}
+
+
+def test_index_picks_up_cars_written_by_other_processes(client, dealer, monkeypatch):
+    add_car(client, dealer, "VIN1")
+    assert by_vin(client, "OTHER") == 404
+    row = {
+        "id": 1000, "make": "Make", "model": "Model", "year": 2020, "color": "Red", "vin": "OTHER",
+        "price": 1.0, "dealer_id": dealer["id"],
+    }
+    # Another process commits a car and its change log entry; this process's commit count does not move.
+    with engine.begin() as conn:
+        conn.execute(insert(Car), row)
+        changes.record_rows(conn, "insert", Car.__table__, [row])
+
+    monkeypatch.setattr(vins, "SYNC_INTERVAL", 0)
+    assert by_vin(client, "OTHER") == 1000
+    duplicate = {key: value for key, value in row.items() if key != "id"}
+    assert client.post("/cars/", json=duplicate).status_code == 409
+
+
+def test_duplicate_missed_by_the_index_is_rejected_on_flush(client, dealer, monkeypatch):
+    add_car(client, dealer, "VIN1")
+    monkeypatch.setattr(vins, "lookup_car_id", lambda db, vin: None)
+    response = client.post("/cars/", json={
+        "make": "Make", "model": "Model", "year": 2020, "color": "Red", "vin": "VIN1",
+        "price": 1.0, "dealer_id": dealer["id"],
+    })
+    assert response.status_code == 409
+    assert response.json()["detail"] == "A car with this VIN already exists"
@@ -0,0 +1,149 @@
+# vins.py
+"""
+Fast VIN lookups.
+
+With VIN_INDEX=on (the default) each process keeps a hash map of VIN to car
+ID in memory, so checking a VIN costs a dictionary lookup instead of a query.
+The map is filled on first use and brought up to date from the change log
+(see changes.py), which records the car inserts, updates and deletes of every
+process in the same transaction as the write. It is synced before the next
+check after this process commits a change, and at least every SYNC_INTERVAL
+seconds otherwise, so cars written by other processes show up within that
+interval. The unique index on cars.vin, and in sharded mode the car_vins
+table of the main database, stays the source of truth: a duplicate missed by
+the pre-check is still rejected when the car is flushed.
+"""
+import os
+import threading
+import time
+from sqlalchemy import func, select
+from models import Car, ChangeLog
+import changes
+import shards
+
+# "on" (default) keeps the in-process VIN map; "off" always queries the cars table.
+VIN_INDEX = os.getenv("VIN_INDEX", "on")
+
+# Maximum number of seconds changes committed by other processes take to reach the map.
+SYNC_INTERVAL = 0.5
+
+_lock = threading.Lock()
+_car_ids_by_vin = {}
+_vins_by_car_id = {}
+# The last change log sequence number applied to the map, per shard (None when unsharded).
+_applied_seqs = {}
+# changes.commit_count and the monotonic time at the last sync.
+_synced_commit_count = None
+_synced_at = 0.0
+
+
+def _shard_ids():
+    """
+    Return the shards whose change logs feed the index.
+    """
+    return shards.SHARD_IDS if shards.SHARDING_ENABLED else [None]
+
+
+def _execute(db, statement, shard_id):
+    """
+    Execute a statement on one shard, or on the database when sharding is off.
+    """
+    return db.execute(statement, bind_arguments={"shard_id": shard_id} if shard_id is not None else None)
+
+
+def _set_vin(car_id, vin):
+    """
+    Record the VIN of a car in the index, or drop the car when vin is None.
+    """
+    old_vin = _vins_by_car_id.pop(car_id, None)
+    if old_vin is not None and _car_ids_by_vin.get(old_vin) == car_id:
+        del _car_ids_by_vin[old_vin]
+    if vin is not None:
+        _vins_by_car_id[car_id] = vin
+        _car_ids_by_vin[vin] = car_id
+
+
+def _load(db, shard_id):
+    """
+    Add every stored VIN of a shard to the index and remember where its change log ends.
+    """
+    # Read the log position first: changes committed while the VINs load are applied again on the next sync.
+    last_seq = _execute(db, select(func.max(ChangeLog.seq)), shard_id).scalar() or 0
+    for car_id, vin in _execute(db, select(Car.id, Car.vin).where(Car.vin.is_not(None)), shard_id):
+        _set_vin(car_id, vin)
+    _applied_seqs[shard_id] = last_seq
+
+
+def _sync(db, shard_id):
+    """
+    Apply the car inserts, VIN updates and deletes logged since the last sync to the index.
+    """
+    entries = _execute(
+        db,
+        select(ChangeLog.seq, ChangeLog.entity, ChangeLog.entity_id, ChangeLog.op, ChangeLog.changed_columns)
+        .where(ChangeLog.seq > _applied_seqs[shard_id])
+        .order_by(ChangeLog.seq),
+        shard_id,
+    ).all()
+    if not entries:
+        return
+    car_ids = {
+        entry.entity_id for entry in entries
+        if entry.entity == Car.__tablename__
+        and (entry.op == "delete" or "vin" in (entry.changed_columns or "").split(","))
+    }
+    if car_ids:
+        # The current rows are authoritative: cars that no longer exist are dropped.
+        current = dict(_execute(db, select(Car.id, Car.vin).where(Car.id.in_(car_ids)), shard_id).all())
+        missing = car_ids - current.keys()
+        if missing and shard_id is not None:
+            # Cars deleted from this shard may have moved to another one with their dealer.
+            current.update(db.execute(select(Car.id, Car.vin).where(Car.id.in_(missing))).all())
+        for car_id in car_ids:
+            _set_vin(car_id, current.get(car_id))
+    _applied_seqs[shard_id] = entries[-1].seq
+
+
+def lookup_car_id(db, vin):
+    """
+    Return the ID of the car with the given VIN.
+
+    Parameters:
+        db (Session): The database session.
+        vin (str): The VIN to look up.
+
+    Returns:
+        Optional[int]: The ID of the car, or None if no car has the VIN.
+    """
+    # Changes flushed but not yet committed must not leak into the index shared by other sessions.
+    if VIN_INDEX != "on" or db.info.get("changes_recorded"):
+        return db.execute(select(Car.id).where(Car.vin == vin)).scalars().first()
+    global _synced_commit_count, _synced_at
+    with _lock:
+        now = time.monotonic()
+        if _synced_commit_count != changes.commit_count or now - _synced_at >= SYNC_INTERVAL:
+            commit_count = changes.commit_count
+            for shard_id in _shard_ids():
+                if shard_id in _applied_seqs:
+                    _sync(db, shard_id)
+                else:
+                    _load(db, shard_id)
+            _synced_commit_count, _synced_at = commit_count, now
+        return _car_ids_by_vin.get(vin)
+
+
+def find_car(db, vin, loads=()):
+    """
+    Look up a car by VIN.
+
+    Parameters:
+        db (Session): The database session.
+        vin (str): The VIN of the car.
+        loads (tuple, optional): Loader options to apply to the car. Defaults to ().
+
+    Returns:
+        Optional[Car]: The car, or None if no car has the VIN.
+    """
+    if VIN_INDEX == "on" and lookup_car_id(db, vin) is None:
+        return None
+    return db.query(Car).options(*loads).filter(Car.vin == vin).first()